@@ -0,0 +1,15 @@
+-- Compact recall logging: detail level + latency on recall_logs
+-- Run after migrations/002_recall_logs.sql
+--
+-- recall_config.log_detail controls what lands in recall_logs.response:
+--   'full'   -> every match as returned (previous behaviour)
+--   'ids'    -> [{chunk_id, source_id, score}] only
+--   'counts' -> NULL response; results_count only
+-- recall_config.log_full_sample_rate (0..1) upgrades a random fraction of
+-- compact rows to 'full' for spot checks.
+
+ALTER TABLE recall_logs ADD COLUMN IF NOT EXISTS log_detail TEXT DEFAULT 'full';
+ALTER TABLE recall_logs ADD COLUMN IF NOT EXISTS latency_ms INT;
+
+-- Analytics queries slice recall_logs by realm over time
+CREATE INDEX IF NOT EXISTS idx_recall_logs_realm_created ON recall_logs(realm_id, created_at DESC);
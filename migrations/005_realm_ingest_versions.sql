@@ -0,0 +1,50 @@
+-- Per-realm ingest version used to invalidate cached recall results
+-- Run after migrations/001_realm_tables.sql
+--
+-- The recall service polls realm_ingest_versions.version (recall_config.result_cache.version_poll_s)
+-- and discards cached answers produced under an older version.
+
+CREATE TABLE IF NOT EXISTS realm_ingest_versions (
+  realm_id TEXT PRIMARY KEY,
+  version BIGINT NOT NULL DEFAULT 0,
+  updated_at TIMESTAMP DEFAULT now()
+);
+
+-- Statement-level triggers so a bulk ingest bumps each touched realm once,
+-- not once per row.
+CREATE OR REPLACE FUNCTION bump_realm_ingest_version()
+RETURNS TRIGGER AS $$
+BEGIN
+  INSERT INTO realm_ingest_versions AS v (realm_id, version, updated_at)
+  SELECT DISTINCT changed.realm_id, 1, now()
+  FROM changed_rows AS changed
+  ON CONFLICT (realm_id) DO UPDATE
+    SET version = v.version + 1,
+        updated_at = now();
+  RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables allow only one event per trigger, so each event gets its
+-- own trigger and exposes its rows under the shared name changed_rows.
+DROP TRIGGER IF EXISTS research_embeddings_ingest_version_ins ON research_embeddings;
+CREATE TRIGGER research_embeddings_ingest_version_ins
+  AFTER INSERT ON research_embeddings
+  REFERENCING NEW TABLE AS changed_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_realm_ingest_version();
+
+DROP TRIGGER IF EXISTS research_embeddings_ingest_version_upd ON research_embeddings;
+CREATE TRIGGER research_embeddings_ingest_version_upd
+  AFTER UPDATE ON research_embeddings
+  REFERENCING NEW TABLE AS changed_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_realm_ingest_version();
+
+DROP TRIGGER IF EXISTS research_embeddings_ingest_version_del ON research_embeddings;
+CREATE TRIGGER research_embeddings_ingest_version_del
+  AFTER DELETE ON research_embeddings
+  REFERENCING OLD TABLE AS changed_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_realm_ingest_version();
+
+ALTER TABLE realm_ingest_versions ENABLE ROW LEVEL SECURITY;
+CREATE POLICY realm_ingest_versions_realm_policy ON realm_ingest_versions
+  FOR SELECT USING (realm_id = auth.jwt() ->> 'realm_id');
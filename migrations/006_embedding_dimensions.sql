@@ -0,0 +1,17 @@
+-- Expose the pgvector column dimension so the recall service can check it at startup
+-- Run after migrations/001_realm_tables.sql
+--
+-- RecallService.check_embedding_dimensions() calls this through PostgREST and
+-- refuses to start a realm whose recall_config.embedding_dimensions differs.
+-- To move a realm to smaller (Matryoshka-truncated) vectors, re-embed into a
+-- column of the new size and update embedding_dimensions in its manifest.
+
+CREATE OR REPLACE FUNCTION research_embedding_dimensions()
+RETURNS INT AS $$
+  -- pgvector stores the declared dimension as the column typmod (-1 when unconstrained).
+  SELECT NULLIF(a.atttypmod, -1)
+  FROM pg_attribute AS a
+  WHERE a.attrelid = 'research_embeddings'::regclass
+    AND a.attname = 'embedding'
+    AND NOT a.attisdropped;
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public, pg_catalog;
@@ -0,0 +1,116 @@
+-- Static, plan-cacheable match function and HNSW vector index
+-- Run after migrations/003_pgvector_search.sql
+--
+-- match_research_embeddings (003) builds dynamic SQL on every call;
+-- match_research_embeddings_v2 is one static query that plpgsql plans once per
+-- connection, with optional per-call ef_search (HNSW) and probes (ivfflat).
+
+CREATE OR REPLACE FUNCTION match_research_embeddings_v2(
+  embedding vector,
+  match_count INT,
+  filter_realm_id TEXT,
+  ef_search INT DEFAULT NULL,
+  probes INT DEFAULT NULL
+)
+RETURNS TABLE(
+  chunk_id UUID,
+  source_id TEXT,
+  content TEXT,
+  similarity FLOAT,
+  metadata JSONB
+) AS $$
+BEGIN
+  PERFORM set_config(
+    'hnsw.ef_search',
+    -- pgvector caps ef_search at 1000.
+    least(1000, greatest(coalesce(ef_search, current_setting('hnsw.ef_search', true)::INT, 40), match_count))::TEXT,
+    true
+  );
+  IF probes IS NOT NULL THEN
+    PERFORM set_config('ivfflat.probes', probes::TEXT, true);
+  END IF;
+  -- pgvector >= 0.8: keep scanning until match_count rows of the realm are found
+  -- (the realm filter runs after the index scan); the CTE restores exact order.
+  IF current_setting('hnsw.iterative_scan', true) IS NOT NULL THEN
+    PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', true);
+    PERFORM set_config('ivfflat.iterative_scan', 'relaxed_order', true);
+  END IF;
+
+  -- $1..$3 are the arguments; positional refs avoid clashing with column names.
+  RETURN QUERY
+  WITH nearest AS MATERIALIZED (
+    SELECT re.chunk_id, re.embedding <=> $1 AS distance
+    FROM research_embeddings AS re
+    WHERE re.realm_id = $3
+    ORDER BY re.embedding <=> $1
+    LIMIT $2
+  )
+  SELECT
+    n.chunk_id,
+    rc.source_id,
+    rc.content,
+    (1 - n.distance)::FLOAT AS similarity,
+    rc.metadata
+  FROM nearest AS n
+  INNER JOIN research_chunks AS rc ON rc.id = n.chunk_id
+  ORDER BY n.distance;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+-- Rebuild the vector index as HNSW (default) or ivfflat (lists defaults to rows/1000).
+-- Raise maintenance_work_mem for large tables before calling this.
+CREATE OR REPLACE FUNCTION rebuild_research_embeddings_index(
+  method TEXT DEFAULT 'hnsw',
+  m INT DEFAULT 16,
+  ef_construction INT DEFAULT 64,
+  lists INT DEFAULT NULL
+)
+RETURNS TEXT AS $$
+DECLARE
+  ddl TEXT;
+  table_schema TEXT;
+BEGIN
+  -- Drop the index next to the research_embeddings that search_path resolves to,
+  -- never a same-named index in another schema.
+  SELECT n.nspname INTO table_schema
+  FROM pg_class AS c
+  INNER JOIN pg_namespace AS n ON n.oid = c.relnamespace
+  WHERE c.oid = 'research_embeddings'::regclass;
+
+  IF method = 'hnsw' THEN
+    ddl := format(
+      'CREATE INDEX idx_research_embeddings_vector ON research_embeddings '
+      'USING hnsw (embedding vector_cosine_ops) WITH (m = %s, ef_construction = %s)',
+      m, ef_construction
+    );
+  ELSIF method = 'ivfflat' THEN
+    IF lists IS NULL THEN
+      SELECT greatest(10, count(*) / 1000) INTO lists FROM research_embeddings;
+    END IF;
+    ddl := format(
+      'CREATE INDEX idx_research_embeddings_vector ON research_embeddings '
+      'USING ivfflat (embedding vector_cosine_ops) WITH (lists = %s)',
+      lists
+    );
+  ELSE
+    RAISE EXCEPTION 'method must be hnsw or ivfflat, got %', method;
+  END IF;
+
+  EXECUTE format('DROP INDEX IF EXISTS %I.idx_research_embeddings_vector', table_schema);
+  EXECUTE ddl;
+  RETURN ddl;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Index DDL is for operators, not the PostgREST roles.
+REVOKE EXECUTE ON FUNCTION rebuild_research_embeddings_index(TEXT, INT, INT, INT) FROM PUBLIC;
+DO $$
+BEGIN
+  -- Supabase grants new functions to these roles directly, not only via PUBLIC.
+  IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+    REVOKE EXECUTE ON FUNCTION rebuild_research_embeddings_index(TEXT, INT, INT, INT) FROM anon, authenticated;
+  END IF;
+END;
+$$;
+
+SELECT rebuild_research_embeddings_index('hnsw', 16, 64);
@@ -0,0 +1,223 @@
+-- List-partition research_chunks and research_embeddings by realm_id
+-- Run after migrations/007_static_match_hnsw.sql
+--
+-- Each realm gets its own partitions, and so its own HNSW graph: a match query
+-- pruned to realm_id = $3 never walks other realms' vectors. Realms without a
+-- partition land in the *_default partitions until ensure_realm_partition()
+-- is called (scripts/generate_realm_manifests.py does, for every realm).
+-- Primary keys become (realm_id, id); embeddings whose realm_id differs from
+-- their chunk's fail the copy below and must be fixed first.
+
+BEGIN;
+
+-- 1. Move the existing tables aside (their indexes and triggers go with them).
+DROP TRIGGER IF EXISTS research_embeddings_ingest_version_ins ON research_embeddings;
+DROP TRIGGER IF EXISTS research_embeddings_ingest_version_upd ON research_embeddings;
+DROP TRIGGER IF EXISTS research_embeddings_ingest_version_del ON research_embeddings;
+DROP INDEX IF EXISTS idx_research_embeddings_vector;
+DROP INDEX IF EXISTS idx_research_embeddings_chunk_id;
+DROP INDEX IF EXISTS idx_research_embeddings_realm_id;
+DROP INDEX IF EXISTS idx_research_chunks_realm_source;
+ALTER TABLE research_embeddings RENAME TO research_embeddings_unpartitioned;
+ALTER TABLE research_embeddings_unpartitioned RENAME CONSTRAINT research_embeddings_pkey TO research_embeddings_unpartitioned_pkey;
+ALTER TABLE research_chunks RENAME TO research_chunks_unpartitioned;
+ALTER TABLE research_chunks_unpartitioned RENAME CONSTRAINT research_chunks_pkey TO research_chunks_unpartitioned_pkey;
+
+-- 2. Partitioned parents; LIKE keeps the column order, types (incl. vector size) and defaults.
+CREATE TABLE research_chunks (
+  LIKE research_chunks_unpartitioned INCLUDING DEFAULTS,
+  PRIMARY KEY (realm_id, id)
+) PARTITION BY LIST (realm_id);
+
+CREATE TABLE research_embeddings (
+  LIKE research_embeddings_unpartitioned INCLUDING DEFAULTS,
+  PRIMARY KEY (realm_id, id),
+  FOREIGN KEY (realm_id, chunk_id) REFERENCES research_chunks (realm_id, id) ON DELETE CASCADE
+) PARTITION BY LIST (realm_id);
+
+CREATE INDEX idx_research_chunks_realm_source ON research_chunks(realm_id, source_id);
+-- Chunk lookups by id alone (callers that do not know the realm).
+CREATE INDEX idx_research_chunks_id ON research_chunks(id);
+-- Covers the FK for ON DELETE CASCADE from research_chunks.
+CREATE INDEX idx_research_embeddings_realm_chunk ON research_embeddings(realm_id, chunk_id);
+
+CREATE TABLE research_chunks_default PARTITION OF research_chunks DEFAULT;
+CREATE TABLE research_embeddings_default PARTITION OF research_embeddings DEFAULT;
+-- Partitions are reached through the parents; with RLS on and no policies,
+-- PostgREST roles that get default table grants still cannot read them directly.
+ALTER TABLE research_chunks_default ENABLE ROW LEVEL SECURITY;
+ALTER TABLE research_embeddings_default ENABLE ROW LEVEL SECURITY;
+
+-- 3. Partition management.
+CREATE OR REPLACE FUNCTION ensure_realm_partition(target_realm_id TEXT)
+RETURNS TEXT AS $$
+DECLARE
+  suffix TEXT;
+  chunks_partition TEXT;
+  embeddings_partition TEXT;
+  bound TEXT := format('FOR VALUES IN (%L)', target_realm_id);
+  has_rows BOOL;
+BEGIN
+  SELECT c.relname INTO embeddings_partition
+  FROM pg_inherits AS i
+  INNER JOIN pg_class AS c ON c.oid = i.inhrelid
+  WHERE i.inhparent = 'research_embeddings'::regclass
+    AND pg_get_expr(c.relpartbound, c.oid) = bound;
+  IF embeddings_partition IS NOT NULL THEN
+    RETURN embeddings_partition;
+  END IF;
+
+  suffix := left(trim(BOTH '_' FROM lower(regexp_replace(target_realm_id, '[^A-Za-z0-9]+', '_', 'g'))), 40);
+  IF suffix = '' OR suffix = 'default' THEN
+    RAISE EXCEPTION 'Cannot derive a partition name from realm_id %', target_realm_id;
+  END IF;
+  chunks_partition := 'research_chunks_' || suffix;
+  embeddings_partition := 'research_embeddings_' || suffix;
+
+  -- A new list partition cannot be created while the default still holds its
+  -- rows, so park them in temp tables and put them back through the parents.
+  SELECT EXISTS (SELECT 1 FROM research_chunks_default WHERE realm_id = target_realm_id)
+      OR EXISTS (SELECT 1 FROM research_embeddings_default WHERE realm_id = target_realm_id)
+    INTO has_rows;
+  IF has_rows THEN
+    DROP TABLE IF EXISTS pg_temp.moving_research_chunks, pg_temp.moving_research_embeddings;
+    CREATE TEMP TABLE moving_research_chunks ON COMMIT DROP AS
+      SELECT * FROM research_chunks_default WHERE realm_id = target_realm_id;
+    CREATE TEMP TABLE moving_research_embeddings ON COMMIT DROP AS
+      SELECT * FROM research_embeddings_default WHERE realm_id = target_realm_id;
+    DELETE FROM research_embeddings_default WHERE realm_id = target_realm_id;
+    DELETE FROM research_chunks_default WHERE realm_id = target_realm_id;
+  END IF;
+
+  EXECUTE format('CREATE TABLE %I PARTITION OF research_chunks %s', chunks_partition, bound);
+  EXECUTE format('CREATE TABLE %I PARTITION OF research_embeddings %s', embeddings_partition, bound);
+  EXECUTE format('ALTER TABLE %I ENABLE ROW LEVEL SECURITY', chunks_partition);
+  EXECUTE format('ALTER TABLE %I ENABLE ROW LEVEL SECURITY', embeddings_partition);
+
+  IF has_rows THEN
+    INSERT INTO research_chunks SELECT * FROM pg_temp.moving_research_chunks;
+    INSERT INTO research_embeddings SELECT * FROM pg_temp.moving_research_embeddings;
+  END IF;
+  RETURN embeddings_partition;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public, pg_catalog;
+
+REVOKE EXECUTE ON FUNCTION ensure_realm_partition(TEXT) FROM PUBLIC;
+DO $$
+BEGIN
+  -- Only the service role (manifest generator) may create partitions through PostgREST.
+  IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+    REVOKE EXECUTE ON FUNCTION ensure_realm_partition(TEXT) FROM anon, authenticated;
+  END IF;
+  IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+    GRANT EXECUTE ON FUNCTION ensure_realm_partition(TEXT) TO service_role;
+  END IF;
+END;
+$$;
+
+-- 4. One partition per realm already in use, then copy the rows across.
+SELECT ensure_realm_partition(realm_id)
+FROM (
+  SELECT realm_id FROM research_chunks_unpartitioned
+  UNION
+  SELECT realm_id FROM research_embeddings_unpartitioned
+) AS realms;
+
+INSERT INTO research_chunks SELECT * FROM research_chunks_unpartitioned;
+INSERT INTO research_embeddings SELECT * FROM research_embeddings_unpartitioned;
+DROP TABLE research_embeddings_unpartitioned;
+DROP TABLE research_chunks_unpartitioned;
+
+-- 5. Vector index after the bulk copy (building is faster than inserting into it).
+SELECT rebuild_research_embeddings_index('hnsw', 16, 64);
+
+-- 6. Ingest-version triggers (005) and realm policies (003) on the new parents.
+CREATE TRIGGER research_embeddings_ingest_version_ins
+  AFTER INSERT ON research_embeddings
+  REFERENCING NEW TABLE AS changed_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_realm_ingest_version();
+CREATE TRIGGER research_embeddings_ingest_version_upd
+  AFTER UPDATE ON research_embeddings
+  REFERENCING NEW TABLE AS changed_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_realm_ingest_version();
+CREATE TRIGGER research_embeddings_ingest_version_del
+  AFTER DELETE ON research_embeddings
+  REFERENCING OLD TABLE AS changed_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_realm_ingest_version();
+
+ALTER TABLE research_chunks ENABLE ROW LEVEL SECURITY;
+ALTER TABLE research_embeddings ENABLE ROW LEVEL SECURITY;
+CREATE POLICY research_chunks_realm_policy ON research_chunks
+  FOR ALL USING (realm_id = auth.jwt() ->> 'realm_id');
+CREATE POLICY research_embeddings_realm_policy ON research_embeddings
+  FOR ALL USING (realm_id = auth.jwt() ->> 'realm_id');
+
+-- 7. Match functions: join chunks on (realm_id, id) so both tables prune to
+-- the realm's partition, and route the 003 signature through the static query.
+CREATE OR REPLACE FUNCTION match_research_embeddings_v2(
+  embedding vector,
+  match_count INT,
+  filter_realm_id TEXT,
+  ef_search INT DEFAULT NULL,
+  probes INT DEFAULT NULL
+)
+RETURNS TABLE(
+  chunk_id UUID,
+  source_id TEXT,
+  content TEXT,
+  similarity FLOAT,
+  metadata JSONB
+) AS $$
+BEGIN
+  PERFORM set_config(
+    'hnsw.ef_search',
+    -- pgvector caps ef_search at 1000.
+    least(1000, greatest(coalesce(ef_search, current_setting('hnsw.ef_search', true)::INT, 40), match_count))::TEXT,
+    true
+  );
+  IF probes IS NOT NULL THEN
+    PERFORM set_config('ivfflat.probes', probes::TEXT, true);
+  END IF;
+  -- Only rows in the default partition share an index with other realms.
+  IF current_setting('hnsw.iterative_scan', true) IS NOT NULL THEN
+    PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', true);
+    PERFORM set_config('ivfflat.iterative_scan', 'relaxed_order', true);
+  END IF;
+
+  -- $1..$3 are the arguments; positional refs avoid clashing with column names.
+  RETURN QUERY
+  WITH nearest AS MATERIALIZED (
+    SELECT re.chunk_id, re.embedding <=> $1 AS distance
+    FROM research_embeddings AS re
+    WHERE re.realm_id = $3
+    ORDER BY re.embedding <=> $1
+    LIMIT $2
+  )
+  SELECT
+    n.chunk_id,
+    rc.source_id,
+    rc.content,
+    (1 - n.distance)::FLOAT AS similarity,
+    rc.metadata
+  FROM nearest AS n
+  INNER JOIN research_chunks AS rc ON rc.realm_id = $3 AND rc.id = n.chunk_id
+  ORDER BY n.distance;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+CREATE OR REPLACE FUNCTION match_research_embeddings(
+  query_embedding vector(1536),
+  match_count INT,
+  filter_realm_id TEXT
+)
+RETURNS TABLE(
+  chunk_id UUID,
+  source_id TEXT,
+  content TEXT,
+  similarity FLOAT,
+  metadata JSONB
+) AS $$
+  SELECT * FROM match_research_embeddings_v2($1, $2, $3);
+$$ LANGUAGE sql STABLE;
+
+COMMIT;
@@ -0,0 +1,92 @@
+-- Metadata filters for recall, pushed down into the match function
+-- Run after migrations/008_realm_partitions.sql
+--
+-- RecallRequest.filters become optional arguments: filter_source_ids (ANY),
+-- filter_metadata (@>), created_after (inclusive) and created_before
+-- (exclusive). Unfiltered calls still run 008's function, cached plan and all.
+
+CREATE INDEX IF NOT EXISTS idx_research_chunks_metadata ON research_chunks USING gin (metadata jsonb_path_ops);
+CREATE INDEX IF NOT EXISTS idx_research_chunks_realm_created ON research_chunks(realm_id, created_at);
+-- idx_research_chunks_realm_source (001/008) already serves filter_source_ids.
+
+-- Kept under a new name rather than dropped, so v2 below only adds the filtered scan.
+ALTER FUNCTION match_research_embeddings_v2(vector, INT, TEXT, INT, INT) RENAME TO match_research_embeddings_unfiltered;
+
+-- 007's per-call scan settings, for match functions that over-fetch or filter.
+CREATE OR REPLACE FUNCTION set_research_match_scan(ef_search INT, probes INT, candidate_count INT)
+RETURNS VOID AS $$
+BEGIN
+  PERFORM set_config(
+    'hnsw.ef_search',
+    -- pgvector caps ef_search at 1000.
+    least(1000, greatest(coalesce(ef_search, current_setting('hnsw.ef_search', true)::INT, 40), candidate_count))::TEXT,
+    true
+  );
+  IF probes IS NOT NULL THEN
+    PERFORM set_config('ivfflat.probes', probes::TEXT, true);
+  END IF;
+  -- Lets filtered scans fill candidate_count from the index instead of stopping at ef_search rows.
+  IF current_setting('hnsw.iterative_scan', true) IS NOT NULL THEN
+    PERFORM set_config('hnsw.iterative_scan', 'relaxed_order', true);
+    PERFORM set_config('ivfflat.iterative_scan', 'relaxed_order', true);
+  END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION match_research_embeddings_v2(
+  embedding vector,
+  match_count INT,
+  filter_realm_id TEXT,
+  ef_search INT DEFAULT NULL,
+  probes INT DEFAULT NULL,
+  filter_source_ids TEXT[] DEFAULT NULL,
+  filter_metadata JSONB DEFAULT NULL,
+  created_after TIMESTAMP DEFAULT NULL,
+  created_before TIMESTAMP DEFAULT NULL
+)
+RETURNS TABLE(
+  chunk_id UUID,
+  source_id TEXT,
+  content TEXT,
+  similarity FLOAT,
+  metadata JSONB
+) AS $$
+BEGIN
+  -- $1..$9 are the arguments; positional refs avoid clashing with column names.
+  IF $6 IS NULL AND $7 IS NULL AND $8 IS NULL AND $9 IS NULL THEN
+    RETURN QUERY SELECT * FROM match_research_embeddings_unfiltered($1, $2, $3, $4, $5);
+    RETURN;
+  END IF;
+  PERFORM set_research_match_scan($4, $5, $2);
+
+  -- A semi-join per index candidate; for very selective filters the planner
+  -- can start from the chunk indexes instead and rank the few rows exactly.
+  RETURN QUERY
+  WITH nearest AS MATERIALIZED (
+    SELECT re.chunk_id, re.embedding <=> $1 AS distance
+    FROM research_embeddings AS re
+    WHERE re.realm_id = $3
+      AND EXISTS (
+        SELECT 1
+        FROM research_chunks AS fc
+        WHERE fc.realm_id = $3
+          AND fc.id = re.chunk_id
+          AND ($6 IS NULL OR fc.source_id = ANY($6))
+          AND ($7 IS NULL OR fc.metadata @> $7)
+          AND ($8 IS NULL OR fc.created_at >= $8)
+          AND ($9 IS NULL OR fc.created_at < $9)
+      )
+    ORDER BY re.embedding <=> $1
+    LIMIT $2
+  )
+  SELECT
+    n.chunk_id,
+    rc.source_id,
+    rc.content,
+    (1 - n.distance)::FLOAT AS similarity,
+    rc.metadata
+  FROM nearest AS n
+  INNER JOIN research_chunks AS rc ON rc.realm_id = $3 AND rc.id = n.chunk_id
+  ORDER BY n.distance;
+END;
+$$ LANGUAGE plpgsql STABLE;
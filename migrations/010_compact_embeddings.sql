@@ -0,0 +1,208 @@
+-- Compact (halfvec / binary-quantised) copies of embeddings for the index scan
+-- Run after migrations/009_recall_filters.sql (needs pgvector >= 0.7)
+--
+-- enable_compact_embeddings('halfvec' | 'binary') adds a trigger-maintained
+-- copy of `embedding` (2 bytes or 1 bit per dimension) with its own HNSW
+-- index. Realms opt in with recall_config.supabase_rpc.storage; the compact
+-- index then supplies match_count * rescore_factor candidates that are ranked
+-- exactly on `embedding`. scripts/bench_compact_embeddings.py picks the
+-- factor. Once no realm uses storage "full", idx_research_embeddings_vector
+-- can be dropped (rebuild_research_embeddings_index() recreates it).
+
+CREATE OR REPLACE FUNCTION sync_research_embedding_compact()
+RETURNS TRIGGER AS $$
+BEGIN
+  -- TG_ARGV[0] is the storage whose column this trigger maintains.
+  IF TG_ARGV[0] = 'halfvec' THEN
+    NEW.embedding_halfvec := NEW.embedding::halfvec;
+  ELSE
+    NEW.embedding_binary := binary_quantize(NEW.embedding);
+  END IF;
+  RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Idempotent. The backfill bumps every realm's ingest version (005), so cached
+-- recall results are refreshed; raise maintenance_work_mem for large tables.
+CREATE OR REPLACE FUNCTION enable_compact_embeddings(
+  storage TEXT DEFAULT 'halfvec',
+  m INT DEFAULT 16,
+  ef_construction INT DEFAULT 64
+)
+RETURNS TEXT AS $$
+DECLARE
+  dimensions INT := research_embedding_dimensions();
+  copy_column TEXT;
+  copy_type TEXT;
+  copy_value TEXT;
+  opclass TEXT;
+  table_schema TEXT;
+  ddl TEXT;
+BEGIN
+  IF dimensions IS NULL THEN
+    RAISE EXCEPTION 'research_embeddings.embedding has no declared dimension';
+  END IF;
+  IF storage = 'halfvec' THEN
+    copy_column := 'embedding_halfvec';
+    copy_type := format('halfvec(%s)', dimensions);
+    copy_value := 'embedding::halfvec';
+    opclass := 'halfvec_cosine_ops';
+  ELSIF storage = 'binary' THEN
+    copy_column := 'embedding_binary';
+    copy_type := format('bit(%s)', dimensions);
+    copy_value := 'binary_quantize(embedding)';
+    opclass := 'bit_hamming_ops';
+  ELSE
+    RAISE EXCEPTION 'storage must be halfvec or binary, got %', storage;
+  END IF;
+
+  SELECT n.nspname INTO table_schema
+  FROM pg_class AS c
+  INNER JOIN pg_namespace AS n ON n.oid = c.relnamespace
+  WHERE c.oid = 'research_embeddings'::regclass;
+
+  EXECUTE format('ALTER TABLE research_embeddings ADD COLUMN IF NOT EXISTS %I %s', copy_column, copy_type);
+  -- Trigger before backfill, so rows written meanwhile are covered either way.
+  EXECUTE format('DROP TRIGGER IF EXISTS %I ON research_embeddings', 'research_embeddings_' || storage || '_sync');
+  EXECUTE format(
+    'CREATE TRIGGER %I BEFORE INSERT OR UPDATE OF embedding ON research_embeddings '
+    'FOR EACH ROW EXECUTE FUNCTION sync_research_embedding_compact(%L)',
+    'research_embeddings_' || storage || '_sync', storage
+  );
+  EXECUTE format(
+    'UPDATE research_embeddings SET %I = %s WHERE %I IS NULL AND embedding IS NOT NULL',
+    copy_column, copy_value, copy_column
+  );
+
+  ddl := format(
+    'CREATE INDEX %I ON research_embeddings USING hnsw (%I %s) WITH (m = %s, ef_construction = %s)',
+    'idx_research_embeddings_' || storage, copy_column, opclass, m, ef_construction
+  );
+  EXECUTE format('DROP INDEX IF EXISTS %I.%I', table_schema, 'idx_research_embeddings_' || storage);
+  EXECUTE ddl;
+  RETURN ddl;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Schema changes are for operators, not the PostgREST roles.
+REVOKE EXECUTE ON FUNCTION enable_compact_embeddings(TEXT, INT, INT) FROM PUBLIC;
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'anon') THEN
+    REVOKE EXECUTE ON FUNCTION enable_compact_embeddings(TEXT, INT, INT) FROM anon, authenticated;
+  END IF;
+END;
+$$;
+
+-- As in 009: full-precision calls keep 009's function, v2 only adds the compact scans.
+ALTER FUNCTION match_research_embeddings_v2(vector, INT, TEXT, INT, INT, TEXT[], JSONB, TIMESTAMP, TIMESTAMP)
+  RENAME TO match_research_embeddings_full;
+
+CREATE OR REPLACE FUNCTION match_research_embeddings_v2(
+  embedding vector,
+  match_count INT,
+  filter_realm_id TEXT,
+  ef_search INT DEFAULT NULL,
+  probes INT DEFAULT NULL,
+  filter_source_ids TEXT[] DEFAULT NULL,
+  filter_metadata JSONB DEFAULT NULL,
+  created_after TIMESTAMP DEFAULT NULL,
+  created_before TIMESTAMP DEFAULT NULL,
+  storage TEXT DEFAULT 'full',
+  rescore_factor INT DEFAULT NULL
+)
+RETURNS TABLE(
+  chunk_id UUID,
+  source_id TEXT,
+  content TEXT,
+  similarity FLOAT,
+  metadata JSONB
+) AS $$
+DECLARE
+  -- $1..$11 are the arguments; positional refs avoid clashing with column names.
+  candidate_count INT := $2 * greatest(coalesce($11, 4), 1);
+  unfiltered BOOL := $6 IS NULL AND $7 IS NULL AND $8 IS NULL AND $9 IS NULL;
+BEGIN
+  IF coalesce($10, 'full') = 'full' THEN
+    RETURN QUERY SELECT * FROM match_research_embeddings_full($1, $2, $3, $4, $5, $6, $7, $8, $9);
+    RETURN;
+  END IF;
+  IF $10 NOT IN ('halfvec', 'binary') THEN
+    RAISE EXCEPTION 'storage must be full, halfvec or binary, got %', $10;
+  END IF;
+  PERFORM set_research_match_scan($4, $5, candidate_count);
+
+  -- Candidates from the compact index, then exact cosine distance on `embedding`
+  -- picks the final match_count. Unfiltered calls never run the subquery.
+  IF $10 = 'halfvec' THEN
+    RETURN QUERY
+    WITH candidates AS MATERIALIZED (
+      SELECT re.chunk_id, re.embedding
+      FROM research_embeddings AS re
+      WHERE re.realm_id = $3
+        AND (unfiltered OR EXISTS (
+          SELECT 1
+          FROM research_chunks AS fc
+          WHERE fc.realm_id = $3
+            AND fc.id = re.chunk_id
+            AND ($6 IS NULL OR fc.source_id = ANY($6))
+            AND ($7 IS NULL OR fc.metadata @> $7)
+            AND ($8 IS NULL OR fc.created_at >= $8)
+            AND ($9 IS NULL OR fc.created_at < $9)
+        ))
+      ORDER BY re.embedding_halfvec <=> $1::halfvec
+      LIMIT candidate_count
+    ),
+    nearest AS MATERIALIZED (
+      SELECT c.chunk_id, c.embedding <=> $1 AS distance
+      FROM candidates AS c
+      ORDER BY 2
+      LIMIT $2
+    )
+    SELECT
+      n.chunk_id,
+      rc.source_id,
+      rc.content,
+      (1 - n.distance)::FLOAT AS similarity,
+      rc.metadata
+    FROM nearest AS n
+    INNER JOIN research_chunks AS rc ON rc.realm_id = $3 AND rc.id = n.chunk_id
+    ORDER BY n.distance;
+    RETURN;
+  END IF;
+
+  RETURN QUERY
+  WITH candidates AS MATERIALIZED (
+    SELECT re.chunk_id, re.embedding
+    FROM research_embeddings AS re
+    WHERE re.realm_id = $3
+      AND (unfiltered OR EXISTS (
+        SELECT 1
+        FROM research_chunks AS fc
+        WHERE fc.realm_id = $3
+          AND fc.id = re.chunk_id
+          AND ($6 IS NULL OR fc.source_id = ANY($6))
+          AND ($7 IS NULL OR fc.metadata @> $7)
+          AND ($8 IS NULL OR fc.created_at >= $8)
+          AND ($9 IS NULL OR fc.created_at < $9)
+      ))
+    ORDER BY re.embedding_binary <~> binary_quantize($1)
+    LIMIT candidate_count
+  ),
+  nearest AS MATERIALIZED (
+    SELECT c.chunk_id, c.embedding <=> $1 AS distance
+    FROM candidates AS c
+    ORDER BY 2
+    LIMIT $2
+  )
+  SELECT
+    n.chunk_id,
+    rc.source_id,
+    rc.content,
+    (1 - n.distance)::FLOAT AS similarity,
+    rc.metadata
+  FROM nearest AS n
+  INNER JOIN research_chunks AS rc ON rc.realm_id = $3 AND rc.id = n.chunk_id
+  ORDER BY n.distance;
+END;
+$$ LANGUAGE plpgsql STABLE;
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Compare recall throughput with the blocking vs async Supabase client.
+
+Runs ``RecallService.run`` against the local fake upstream at increasing
+concurrency on a single event loop (one uvicorn worker). With the blocking
+client throughput stays flat; with ``AsyncSupabaseClient`` it scales.
+
+    python scripts/bench_recall_concurrency.py --latency-ms 40 --requests 128
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fake_upstream import start_fake_upstream  # noqa: E402
+
+
+def build_config(base_url: str):
+    from te_po.backend.schema.realms import RealmConfig, SupabaseConfig
+
+    return RealmConfig(
+        realm_id="bench",
+        display_name="Benchmark Realm",
+        te_po_url=None,
+        supabase=SupabaseConfig(project_url=base_url, anon_key="bench"),
+        features={"recall": True},
+        recall_config={"vector_store": "supabase"},
+    )
+
+
+def blocking_service_class():
+    from te_po.backend.db.supabase import SupabaseClient
+    from te_po.backend.utils.recall_service import RecallService
+
+    class BlockingRecallService(RecallService):
+        """The pre-async code path: sync httpx calls inside async methods."""
+
+        def __init__(self, config, http_pool=None):
+            super().__init__(config, http_pool=http_pool)
+            self.sync_client = SupabaseClient(project_url=config.supabase.project_url, anon_key="bench")
+
+        async def search_supabase(self, embedding: List[float], top_k: int, filters=None) -> List[Dict[str, Any]]:
+            return self.sync_client.rpc_match_embeddings(
+                embedding=embedding, match_count=top_k, filter_realm_id=self.config.realm_id
+            )
+
+        async def log(
+            self,
+            query: str,
+            matches: List[Dict[str, Any]],
+            vector_store: str,
+            latency_ms: Optional[int] = None,
+        ) -> None:
+            self.sync_client.insert_with_realm(
+                table=self.config.supabase.tables.recall_logs,
+                payload=self._log_row(query, matches, vector_store, latency_ms),
+                realm_id=self.config.realm_id,
+            )
+
+    return BlockingRecallService
+
+
+async def measure(service, requests: int, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            await service.run({"query": f"kōrero {i}", "top_k": 5, "vector_store": "supabase"})
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+async def run_bench(base_url: str, requests: int, levels: List[int]) -> None:
+    from te_po.backend.utils.http_pool import HttpClientPool
+    from te_po.backend.utils.recall_service import RecallService
+
+    config = build_config(base_url)
+    pool = HttpClientPool()
+    variants = {"blocking": blocking_service_class()(config, http_pool=pool), "async": RecallService(config, http_pool=pool)}
+    print(f"{'concurrency':>11} | {'blocking req/s':>14} | {'async req/s':>11}")
+    for level in levels:
+        row = {name: await measure(service, requests, level) for name, service in variants.items()}
+        print(f"{level:>11} | {row['blocking']:>14.1f} | {row['async']:>11.1f}")
+    await pool.aclose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--requests", type=int, default=128)
+    parser.add_argument("--levels", default="1,4,16,64")
+    args = parser.parse_args()
+
+    server, base_url = start_fake_upstream(latency_ms=args.latency_ms)
+    os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY") or "bench"
+    os.environ["SUPABASE_SERVICE_ROLE_KEY"] = "bench"
+    os.environ["OPENAI_BASE_URL"] = f"{base_url}/v1"
+    levels = [int(level) for level in args.levels.split(",")]
+    try:
+        asyncio.run(run_bench(base_url, args.requests, levels))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
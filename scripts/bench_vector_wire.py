@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""Measure bytes on the wire and serialisation CPU for one recall's vectors.
+
+Compares the old path (JSON float list from OpenAI, parsed into a Python
+list, re-serialised as a JSON array into the pgvector RPC body with stdlib
+json) against the new one (base64 float32 decoded into an ``array('f')``,
+sent as a ``%.9g`` pgvector literal via ``vector_codec.dumps``). Runs offline.
+
+    python scripts/bench_vector_wire.py --dimensions 3072 --iterations 2000
+"""
+
+import argparse
+import base64
+import json
+import random
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from te_po.backend.utils import vector_codec  # noqa: E402
+from te_po.backend.utils.vector_codec import decode_embedding, dumps, loads, pgvector_literal  # noqa: E402
+
+
+def cpu_us(func: Callable[[], object], iterations: int) -> float:
+    started = time.process_time()
+    for _ in range(iterations):
+        func()
+    return (time.process_time() - started) / iterations * 1_000_000
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dimensions", type=int, default=3072)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    floats = [random.uniform(-0.1, 0.1) for _ in range(args.dimensions)]
+    # What the embeddings API sends back for each encoding_format.
+    json_response = json.dumps({"data": [{"index": 0, "embedding": floats}]}).encode("utf-8")
+    packed = base64.b64encode(struct.pack(f"<{args.dimensions}f", *floats)).decode("ascii")
+    base64_response = json.dumps({"data": [{"index": 0, "embedding": packed}]}).encode("utf-8")
+    vector = decode_embedding(packed)
+    rpc = {"match_count": 10, "filter_realm_id": "researcher"}
+
+    def before_decode():
+        return json.loads(json_response)["data"][0]["embedding"]
+
+    def after_decode():
+        return decode_embedding(loads(base64_response)["data"][0]["embedding"])
+
+    def before_encode():
+        return json.dumps({**rpc, "embedding": floats}).encode("utf-8")
+
+    def after_encode():
+        return dumps({**rpc, "embedding": pgvector_literal(vector)})
+
+    rows: Dict[str, Dict[str, float]] = {
+        "embeddings response": {
+            "before_bytes": len(json_response),
+            "after_bytes": len(base64_response),
+            "before_us": cpu_us(before_decode, args.iterations),
+            "after_us": cpu_us(after_decode, args.iterations),
+        },
+        "rpc request body": {
+            "before_bytes": len(before_encode()),
+            "after_bytes": len(after_encode()),
+            "before_us": cpu_us(before_encode, args.iterations),
+            "after_us": cpu_us(after_encode, args.iterations),
+        },
+    }
+    encoder = "orjson" if vector_codec.orjson is not None else "json (orjson not installed)"
+    print(f"dimensions={args.dimensions} iterations={args.iterations} encoder={encoder}")
+    print(f"{'stage':>20} {'bytes before':>13} {'bytes after':>12} {'cpu us before':>14} {'cpu us after':>13}")
+    for stage, row in rows.items():
+        print(
+            f"{stage:>20} {row['before_bytes']:>13} {row['after_bytes']:>12} "
+            f"{row['before_us']:>14.1f} {row['after_us']:>13.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
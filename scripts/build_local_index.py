@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Export a realm's research_embeddings into a local recall snapshot.
+
+The snapshot is served by the ``"local"`` vector_store backend; point the
+realm's ``recall_config.local_index_path`` at the output directory.
+
+    python scripts/build_local_index.py researcher data/local_index/researcher --ivf-lists 1024
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+import httpx
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from te_po.backend.schema.realms import RealmConfigLoader  # noqa: E402
+from te_po.backend.utils.local_vector_index import build_snapshot  # noqa: E402
+
+
+def fetch_rows(realm_id: str, page_size: int) -> Iterator[Tuple[Dict[str, Any], List[float]]]:
+    config = RealmConfigLoader.load(realm_id)
+    tables = config.supabase.tables
+    project_url = config.supabase.project_url or os.getenv("SUPABASE_URL")
+    api_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or config.supabase.anon_key
+    if not project_url or not api_key:
+        raise SystemExit("Missing Supabase URL/key (set SUPABASE_SERVICE_ROLE_KEY)")
+    headers = {"apikey": api_key, "Authorization": f"Bearer {api_key}"}
+    url = f"{project_url}/rest/v1/{tables.embeddings}"
+    offset = 0
+    with httpx.Client(timeout=120.0, headers=headers) as client:
+        while True:
+            params = {
+                "select": f"chunk_id,embedding,{tables.chunks}(source_id,content,metadata,created_at)",
+                "realm_id": f"eq.{realm_id}",
+                "order": "id",
+                "limit": str(page_size),
+                "offset": str(offset),
+            }
+            response = client.get(url, params=params)
+            response.raise_for_status()
+            page = response.json()
+            for item in page:
+                chunk = item.get(tables.chunks) or {}
+                embedding = item["embedding"]
+                # PostgREST renders pgvector values as their text literal "[0.1,0.2,...]"
+                if isinstance(embedding, str):
+                    embedding = json.loads(embedding)
+                row = {
+                    "chunk_id": item.get("chunk_id"),
+                    "source_id": chunk.get("source_id"),
+                    "content": chunk.get("content"),
+                    "metadata": chunk.get("metadata"),
+                    "created_at": chunk.get("created_at"),
+                }
+                yield row, embedding
+            if len(page) < page_size:
+                return
+            offset += page_size
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("realm_id")
+    parser.add_argument("output", type=Path)
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    parser.add_argument("--ivf-lists", type=int, default=0, help="build an IVF index with this many lists (0 = exact only)")
+    parser.add_argument("--page-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    rows: List[Dict[str, Any]] = []
+    vectors: List[List[float]] = []
+    for row, embedding in fetch_rows(args.realm_id, args.page_size):
+        rows.append(row)
+        vectors.append(embedding)
+    if not rows:
+        raise SystemExit(f"No embeddings found for realm {args.realm_id}")
+    build_snapshot(args.output, rows, np.asarray(vectors, dtype=np.float32), dtype=args.dtype, ivf_lists=args.ivf_lists)
+    print(f"✅ wrote {len(rows)} vectors ({len(vectors[0])} dims, {args.dtype}) to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
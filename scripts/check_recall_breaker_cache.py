@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Check that a warm recall query keeps returning cached results while the Supabase breaker is open.
+
+Warms the result cache against the local fake upstream, then fails every
+match RPC until the circuit breaker opens and asserts that each response
+(plain and streamed) still carries the cached matches, marked ``stale``.
+Exits non-zero on the first failed check.
+
+    python scripts/check_recall_breaker_cache.py
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fake_upstream import FakeUpstreamHandler, start_fake_upstream  # noqa: E402
+
+
+def build_config(base_url: str):
+    from te_po.backend.schema.realms import RealmConfig, SupabaseConfig
+
+    return RealmConfig(
+        realm_id="check",
+        display_name="Breaker Check Realm",
+        te_po_url=None,
+        supabase=SupabaseConfig(project_url=base_url, anon_key="check"),
+        features={"recall": True},
+        recall_config={
+            "vector_store": "both",
+            "supabase_rpc": {"function": "match_research_embeddings_v2", "hedge": False},
+            # Every lookup misses freshness, so each request really tries the backends.
+            "result_cache": {"enabled": True, "ttl_s": 0, "stale_while_revalidate_s": 0, "stale_if_error_s": 3600},
+        },
+    )
+
+
+def check(condition: bool, message: str) -> None:
+    print(f"{'✅' if condition else '❌'} {message}")
+    if not condition:
+        raise SystemExit(1)
+
+
+async def run_check(base_url: str) -> None:
+    from te_po.backend.utils.http_pool import HttpClientPool
+    from te_po.backend.utils.recall_cache import RecallResultCache
+    from te_po.backend.utils.recall_service import RecallService
+    from te_po.backend.utils.rpc_guard import RpcGuards
+
+    pool = HttpClientPool()
+    guards = RpcGuards(failure_threshold=2, reset_s=60)
+    service = RecallService(build_config(base_url), http_pool=pool, result_cache=RecallResultCache(), rpc_guards=guards)
+    payload: Dict[str, Any] = {"query": "he aha te mauri", "top_k": 3}
+    try:
+        warm = await service.run(payload)
+        check(len(warm["matches"]) == 3 and not warm["partial"], "warm query answered by Supabase")
+
+        FakeUpstreamHandler.rpc_error_rate = 1.0
+        for attempt in range(4):
+            response = await service.run(payload)
+            check(
+                response["matches"] == warm["matches"] and response["stale"],
+                f"outage request {attempt + 1}: cached matches served stale "
+                f"(breaker {service.rpc_guard.breaker.state})",
+            )
+        check(service.rpc_guard.breaker.is_open(), "breaker is open")
+
+        calls = service.rpc_guard.calls
+        frames = [frame async for frame in service.stream(payload)]
+        merged = next((frame for frame in frames if frame["type"] == "merged"), None)
+        check(merged is not None and merged["matches"] == warm["matches"], "stream serves the cached matches")
+        check(service.rpc_guard.calls == calls, "no match RPC attempted while the breaker is open")
+    finally:
+        await service.aclose()
+        await pool.aclose()
+
+
+def main() -> None:
+    server, base_url = start_fake_upstream()
+    os.environ["OPENAI_API_KEY"] = os.getenv("OPENAI_API_KEY") or "check"
+    os.environ["SUPABASE_SERVICE_ROLE_KEY"] = "check"
+    os.environ["OPENAI_BASE_URL"] = f"{base_url}/v1"
+    try:
+        asyncio.run(run_check(base_url))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Local stand-in for the OpenAI embeddings API and Supabase PostgREST.
+
+Used by the recall benchmarks so they can run offline. Every response is
+delayed by ``--latency-ms`` to mimic a real network round-trip, and
+``--error-rate`` makes that fraction of embeddings calls answer 429 with a
+``Retry-After`` to exercise client backoff. ``--rpc-tail-rate`` /
+``--rpc-tail-ms`` add a slow tail to the match RPC and ``--rpc-error-rate``
+makes it fail with 503, for hedging and circuit-breaker checks.
+
+    python scripts/fake_upstream.py --port 8787 --latency-ms 40
+"""
+
+import argparse
+import base64
+import json
+import random
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+
+
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency_s = 0.0
+    dimensions = 1536
+    request_count = 0
+    error_rate = 0.0
+    retry_after_ms = 200
+    throttled_count = 0
+    rpc_tail_rate = 0.0
+    rpc_tail_s = 0.0
+    rpc_error_rate = 0.0
+    _lock = threading.Lock()
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+    def _send_json(self, status: int, payload: Any, headers: Dict[str, str] = None) -> None:
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client gave up (e.g. a recall backend deadline fired); nothing to do.
+            pass
+
+    def _read_json(self) -> Any:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        return json.loads(raw) if raw else None
+
+    def _embeddings(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        inputs = body.get("input")
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        dims = int(body.get("dimensions") or self.dimensions)
+        data = []
+        for i in range(len(inputs)):
+            vector = [random.uniform(-1, 1) for _ in range(dims)]
+            if body.get("encoding_format") == "base64":
+                vector = base64.b64encode(struct.pack(f"<{dims}f", *vector)).decode("ascii")
+            data.append({"object": "embedding", "index": i, "embedding": vector})
+        tokens = sum(max(1, len(str(text).split())) for text in inputs)
+        return {"object": "list", "data": data, "model": body.get("model"), "usage": {"prompt_tokens": tokens, "total_tokens": tokens}}
+
+    @staticmethod
+    def _matches(count: int) -> List[Dict[str, Any]]:
+        return [
+            {
+                "chunk_id": f"00000000-0000-0000-0000-{i:012d}",
+                "source_id": f"source-{i % 3}",
+                "content": f"synthetic chunk {i}",
+                "similarity": round(1.0 - i / (count + 1), 4),
+                "metadata": {},
+            }
+            for i in range(count)
+        ]
+
+    def do_POST(self) -> None:
+        body = self._read_json() or {}
+        with self._lock:
+            FakeUpstreamHandler.request_count += 1
+        time.sleep(self.latency_s)
+        if self.path.endswith("/embeddings"):
+            if self.error_rate and random.random() < self.error_rate:
+                with self._lock:
+                    FakeUpstreamHandler.throttled_count += 1
+                self._send_json(
+                    429,
+                    {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                    {
+                        "retry-after-ms": str(self.retry_after_ms),
+                        "x-ratelimit-remaining-requests": "0",
+                        "x-ratelimit-reset-requests": f"{self.retry_after_ms}ms",
+                    },
+                )
+                return
+            self._send_json(
+                200,
+                self._embeddings(body),
+                {
+                    "x-ratelimit-limit-requests": "3000",
+                    "x-ratelimit-remaining-requests": "2999",
+                    "x-ratelimit-reset-requests": "20ms",
+                    "x-ratelimit-limit-tokens": "1000000",
+                    "x-ratelimit-remaining-tokens": "999000",
+                    "x-ratelimit-reset-tokens": "60ms",
+                },
+            )
+        elif self.path.endswith("/rpc/research_embedding_dimensions"):
+            self._send_json(200, self.dimensions)
+        elif self.path.endswith("/rpc/ensure_realm_partition"):
+            self._send_json(200, f"research_embeddings_{body.get('target_realm_id', '')}")
+        elif "/rest/v1/rpc/" in self.path:
+            if self.rpc_tail_rate and random.random() < self.rpc_tail_rate:
+                time.sleep(self.rpc_tail_s)
+            if self.rpc_error_rate and random.random() < self.rpc_error_rate:
+                self._send_json(503, {"message": "upstream unavailable"})
+                return
+            self._send_json(200, self._matches(int(body.get("match_count", 5))))
+        elif "/rest/v1/" in self.path:
+            self.send_response(201)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        else:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+    def do_GET(self) -> None:
+        time.sleep(self.latency_s)
+        self._send_json(200, [])
+
+
+def start_fake_upstream(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    latency_ms: float = 0.0,
+    error_rate: float = 0.0,
+    rpc_tail_rate: float = 0.0,
+    rpc_tail_ms: float = 0.0,
+    rpc_error_rate: float = 0.0,
+) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the fake upstream on a daemon thread and return (server, base_url)."""
+    FakeUpstreamHandler.latency_s = latency_ms / 1000.0
+    FakeUpstreamHandler.error_rate = error_rate
+    FakeUpstreamHandler.rpc_tail_rate = rpc_tail_rate
+    FakeUpstreamHandler.rpc_tail_s = rpc_tail_ms / 1000.0
+    FakeUpstreamHandler.rpc_error_rate = rpc_error_rate
+    server = ThreadingHTTPServer((host, port), FakeUpstreamHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of embeddings calls answered with 429")
+    parser.add_argument("--rpc-tail-rate", type=float, default=0.0, help="fraction of match RPCs that are slow")
+    parser.add_argument("--rpc-tail-ms", type=float, default=2000.0)
+    parser.add_argument("--rpc-error-rate", type=float, default=0.0, help="fraction of match RPCs answered with 503")
+    args = parser.parse_args()
+    server, base_url = start_fake_upstream(
+        args.host,
+        args.port,
+        args.latency_ms,
+        args.error_rate,
+        args.rpc_tail_rate,
+        args.rpc_tail_ms,
+        args.rpc_error_rate,
+    )
+    print(f"✅ fake upstream listening on {base_url} (latency {args.latency_ms} ms)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
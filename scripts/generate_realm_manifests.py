@@ -3,7 +3,13 @@
 
 import json
 import os
+import sys
 from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from te_po.backend.db.supabase import SupabaseClient  # noqa: E402
 
 
 def require(name: str) -> str:
@@ -19,6 +25,24 @@ def write_json(path: Path, obj: dict) -> None:
     print(f"✅ wrote {path}")
 
 
+def ensure_partitions(supabase_url: str, realm_ids: List[str]) -> None:
+    """Create each realm's research_chunks/research_embeddings partitions (migration 008)."""
+    service_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
+    if not service_key:
+        print(
+            "⚠️  SUPABASE_SERVICE_ROLE_KEY not set; run SELECT ensure_realm_partition('<realm_id>') for: "
+            + ", ".join(realm_ids)
+        )
+        return
+    client = SupabaseClient(project_url=supabase_url, service_role_key=service_key)
+    for realm_id in realm_ids:
+        partition = client.rpc("ensure_realm_partition", {"target_realm_id": realm_id})
+        if partition:
+            print(f"✅ partition {partition} ready for realm {realm_id}")
+        else:
+            print(f"⚠️  no partition for realm {realm_id}; is migration 008 applied?")
+
+
 def realm_manifest(
     realm_id: str,
     assistant_id: str,
@@ -63,6 +87,47 @@ def realm_manifest(
             "vector_store": "both",
             "top_k": 5,
             "use_supabase_pgvector": True,
+            "embedding_provider": "openai",
+            "embedding_model": "text-embedding-3-large",
+            "embedding_dimensions": 1536,
+            "embedding_truncation": "api",
+            "backend_timeouts_ms": {"openai": 8000, "supabase": 5000},
+            "supabase_rpc": {
+                "function": "match_research_embeddings_v2",
+                "ef_search": 64,
+                "probes": None,
+                "storage": "full",
+                "rescore_factor": 4,
+                "hedge": True,
+                "hedge_quantile": 0.95,
+                "hedge_min_delay_ms": 50,
+                "hedge_max_delay_ms": 2000,
+                "hedge_min_samples": 20,
+                "fallback": None,
+            },
+            "supabase_transport": "postgrest",
+            "postgres": {"dsn_env": "DATABASE_URL"},
+            "log_detail": "full",
+            "log_full_sample_rate": 0.0,
+            "result_cache": {
+                "enabled": True,
+                "ttl_s": 60,
+                "stale_while_revalidate_s": 300,
+                "stale_if_error_s": 3600,
+                "version_poll_s": 15,
+            },
+            "single_flight": True,
+            "embed_batch_window_ms": 5,
+            "admission": {"max_concurrent": 32, "max_queue": 64, "queue_timeout_ms": 2000},
+            "batch_max_queries": 100,
+            "batch_max_concurrency": 8,
+            "merge": {
+                "method": "rrf",
+                "rrf_k": 60,
+                "weights": {"openai": 1.0, "supabase": 1.0, "local": 1.0},
+                "dedup_by": "chunk_id",
+                "overfetch": 2,
+            },
         },
     }
 
@@ -97,6 +162,7 @@ def main() -> None:
 
     write_json(Path("mauri/realms/researcher/manifest.json"), researcher)
     write_json(Path("mauri/realms/translator/manifest.json"), translator)
+    ensure_partitions(supabase_url, [researcher["realm_id"], translator["realm_id"]])
 
 
 if __name__ == "__main__":
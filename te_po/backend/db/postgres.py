@@ -0,0 +1,164 @@
+import asyncio
+import os
+import re
+import struct
+import sys
+from array import array
+from typing import Any, Dict, List, Optional, Sequence, Union
+from urllib.parse import urlsplit
+
+from ..utils.vector_codec import dumps, loads
+
+_VECTOR_HEADER = struct.Struct(">HH")
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+MATCH_COLUMNS = "chunk_id, source_id, content, similarity, metadata"
+
+
+def encode_vector(vector: Union[bytes, array, Sequence[float]]) -> bytes:
+    """pgvector binary format (uint16 dims, uint16 unused, big-endian float32); ``bytes`` pass through."""
+    if isinstance(vector, bytes):
+        return vector
+    values = array("f", vector)
+    if sys.byteorder == "little":
+        values.byteswap()
+    return _VECTOR_HEADER.pack(len(values), 0) + values.tobytes()
+
+
+def decode_vector(data: bytes) -> array:
+    dimensions, _ = _VECTOR_HEADER.unpack_from(data)
+    values = array("f")
+    values.frombytes(data[_VECTOR_HEADER.size:_VECTOR_HEADER.size + 4 * dimensions])
+    if sys.byteorder == "little":
+        values.byteswap()
+    return values
+
+
+def redact_dsn(dsn: str) -> str:
+    """``postgresql://host:port/db`` without credentials, for stats and breaker keys."""
+    parts = urlsplit(dsn)
+    host = parts.hostname or "localhost"
+    port = f":{parts.port}" if parts.port else ""
+    return f"{parts.scheme}://{host}{port}{parts.path}"
+
+
+async def _init_connection(conn) -> None:
+    # pgvector lives in "extensions" on Supabase and usually "public" elsewhere.
+    schema = await conn.fetchval(
+        "SELECT n.nspname FROM pg_type AS t INNER JOIN pg_namespace AS n ON n.oid = t.typnamespace "
+        "WHERE t.typname = 'vector' LIMIT 1"
+    )
+    if schema is None:
+        raise RuntimeError("pgvector type 'vector' not found; run CREATE EXTENSION vector")
+    await conn.set_type_codec("vector", schema=schema, encoder=encode_vector, decoder=decode_vector, format="binary")
+    await conn.set_type_codec(
+        "jsonb", schema="pg_catalog", encoder=lambda value: dumps(value).decode("utf-8"), decoder=loads
+    )
+
+
+class PostgresPools:
+    """asyncpg connection pools keyed by DSN, shared by every realm on the same database."""
+
+    def __init__(
+        self,
+        min_size: Optional[int] = None,
+        max_size: Optional[int] = None,
+        statement_cache_size: Optional[int] = None,
+    ) -> None:
+        self.min_size = min_size if min_size is not None else int(os.getenv("RECALL_PG_MIN_SIZE", "1"))
+        self.max_size = max_size or int(os.getenv("RECALL_PG_MAX_SIZE", "10"))
+        # Supabase's transaction-mode pooler (port 6543) cannot hold prepared statements; use 0 there.
+        self.statement_cache_size = (
+            statement_cache_size
+            if statement_cache_size is not None
+            else int(os.getenv("RECALL_PG_STATEMENT_CACHE_SIZE", "100"))
+        )
+        self._pools: Dict[str, Any] = {}
+        self._lock = asyncio.Lock()
+
+    async def get(self, dsn: str) -> Any:
+        pool = self._pools.get(dsn)
+        if pool is not None:
+            return pool
+        async with self._lock:
+            pool = self._pools.get(dsn)
+            if pool is None:
+                try:
+                    import asyncpg
+                except ImportError as exc:
+                    raise RuntimeError("recall_config.supabase_transport 'asyncpg' needs the asyncpg package") from exc
+                pool = await asyncpg.create_pool(
+                    dsn,
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    statement_cache_size=self.statement_cache_size,
+                    init=_init_connection,
+                )
+                self._pools[dsn] = pool
+        return pool
+
+    async def aclose(self) -> None:
+        pools = list(self._pools.values())
+        self._pools.clear()
+        for pool in pools:
+            await pool.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            redact_dsn(dsn): {"size": pool.get_size(), "idle": pool.get_idle_size(), "max_size": pool.get_max_size()}
+            for dsn, pool in self._pools.items()
+        }
+
+
+class PostgresVectorClient:
+    """Direct pgvector search over pooled asyncpg connections, calling the same match function as PostgREST."""
+
+    def __init__(self, dsn: str, pools: PostgresPools) -> None:
+        self.dsn = dsn
+        self.pools = pools
+        self.name = redact_dsn(dsn)
+
+    @classmethod
+    def from_config(cls, realm_id: str, settings: Dict[str, Any], pools: PostgresPools) -> "PostgresVectorClient":
+        """Resolve ``recall_config.postgres``: ``dsn_env`` (default ``DATABASE_URL``) or a literal ``dsn``."""
+        env_name = settings.get("dsn_env", "DATABASE_URL")
+        dsn = settings.get("dsn") or os.getenv(env_name)
+        if not dsn:
+            raise ValueError(f"Realm {realm_id} uses supabase_transport 'asyncpg' but {env_name} is not set")
+        return cls(dsn, pools)
+
+    async def match_embeddings(
+        self,
+        embedding: Union[bytes, Sequence[float]],
+        match_count: int,
+        filter_realm_id: str,
+        function_name: str = "match_research_embeddings",
+        search_params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        if not _IDENTIFIER.match(function_name):
+            raise ValueError(f"Invalid match function name {function_name!r}")
+        args: List[Any] = [encode_vector(embedding), match_count, filter_realm_id]
+        # Named arguments mirror the optional JSON keys of the PostgREST call.
+        named = []
+        for key, value in (search_params or {}).items():
+            if not _IDENTIFIER.match(key):
+                raise ValueError(f"Invalid search parameter {key!r}")
+            args.append(value)
+            named.append(f", {key} => ${len(args)}")
+        sql = f"SELECT {MATCH_COLUMNS} FROM {function_name}($1, $2, $3{''.join(named)})"
+        pool = await self.pools.get(self.dsn)
+        rows = await pool.fetch(sql, *args, timeout=timeout)
+        return [
+            {
+                "chunk_id": str(row["chunk_id"]) if row["chunk_id"] is not None else None,
+                "source_id": row["source_id"],
+                "content": row["content"],
+                "similarity": row["similarity"],
+                "metadata": row["metadata"],
+            }
+            for row in rows
+        ]
+
+    async def fetchval(self, sql: str, *args: Any) -> Any:
+        pool = await self.pools.get(self.dsn)
+        return await pool.fetchval(sql, *args)
@@ -1,15 +1,17 @@
 import json
 import os
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Union
 
 import httpx
 from httpx import HTTPStatusError
 
+from ..utils.vector_codec import dumps, loads, pgvector_literal
+
 TIMEOUT = 30.0
 
 
-class SupabaseClient:
-    """Lightweight Supabase helper that respects realm-scoped credentials."""
+class _SupabaseCredentials:
+    """Shared credential resolution for the sync and async Supabase helpers."""
 
     def __init__(
         self,
@@ -30,11 +32,31 @@ class SupabaseClient:
             "Content-Type": "application/json",
         }
 
+
+class SupabaseClient(_SupabaseCredentials):
+    """Lightweight Supabase helper that respects realm-scoped credentials."""
+
+    def __init__(
+        self,
+        project_url: Optional[str] = None,
+        service_role_key: Optional[str] = None,
+        anon_key: Optional[str] = None,
+        http_client: Optional[httpx.Client] = None,
+    ) -> None:
+        super().__init__(project_url, service_role_key, anon_key)
+        # Optional long-lived client so repeated calls reuse keep-alive connections
+        self.http_client = http_client
+
+    def _post(self, url: str, body: Any) -> httpx.Response:
+        if self.http_client is not None:
+            return self.http_client.post(url, headers=self._headers(), json=body, timeout=TIMEOUT)
+        return httpx.post(url, headers=self._headers(), json=body, timeout=TIMEOUT)
+
     def insert_with_realm(self, table: str, payload: Dict[str, Any], realm_id: str) -> Dict[str, Any]:
         url = f"{self.project_url}/rest/v1/{table}"
         body = {**payload, "realm_id": realm_id}
         try:
-            response = httpx.post(url, headers=self._headers(), json=body, timeout=TIMEOUT)
+            response = self._post(url, body)
             response.raise_for_status()
             try:
                 return response.json()
@@ -48,17 +70,17 @@ class SupabaseClient:
         self,
         match_count: int,
         filter_realm_id: str,
-        embedding: List[float],
+        embedding: Union[str, Sequence[float]],
         function_name: str = "match_research_embeddings",
     ) -> List[Dict[str, Any]]:
         url = f"{self.project_url}/rest/v1/rpc/{function_name}"
         payload = {
-            "embedding": embedding,
+            "embedding": embedding if isinstance(embedding, str) else pgvector_literal(embedding),
             "match_count": match_count,
             "filter_realm_id": filter_realm_id,
         }
         try:
-            response = httpx.post(url, headers=self._headers(), json=payload, timeout=TIMEOUT)
+            response = self._post(url, payload)
             response.raise_for_status()
             try:
                 return response.json()
@@ -67,3 +89,154 @@ class SupabaseClient:
         except HTTPStatusError as exc:
             print(f"[supabase] RPC {function_name} failed: {exc}")
             return []
+
+    def rpc(self, function_name: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """Call a Postgres function through PostgREST and return its decoded result."""
+        url = f"{self.project_url}/rest/v1/rpc/{function_name}"
+        try:
+            response = self._post(url, params or {})
+            response.raise_for_status()
+            try:
+                return response.json()
+            except json.JSONDecodeError:
+                return None
+        except HTTPStatusError as exc:
+            print(f"[supabase] RPC {function_name} failed: {exc}")
+            return None
+
+
+class AsyncSupabaseClient(_SupabaseCredentials):
+    """Non-blocking twin of ``SupabaseClient``; pass a pooled ``httpx.AsyncClient`` to reuse connections."""
+
+    def __init__(
+        self,
+        project_url: Optional[str] = None,
+        service_role_key: Optional[str] = None,
+        anon_key: Optional[str] = None,
+        http_client: Optional[httpx.AsyncClient] = None,
+    ) -> None:
+        super().__init__(project_url, service_role_key, anon_key)
+        self.http_client = http_client
+        self._owns_client = http_client is None
+
+    def _client(self) -> httpx.AsyncClient:
+        if self.http_client is None or self.http_client.is_closed:
+            self.http_client = httpx.AsyncClient(timeout=TIMEOUT)
+            self._owns_client = True
+        return self.http_client
+
+    async def _post(
+        self,
+        url: str,
+        body: Any,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: float = TIMEOUT,
+    ) -> httpx.Response:
+        return await self._client().post(url, headers=headers or self._headers(), content=dumps(body), timeout=timeout)
+
+    async def aclose(self) -> None:
+        if self._owns_client and self.http_client is not None:
+            await self.http_client.aclose()
+            self.http_client = None
+
+    async def insert_with_realm(self, table: str, payload: Dict[str, Any], realm_id: str) -> Dict[str, Any]:
+        url = f"{self.project_url}/rest/v1/{table}"
+        body = {**payload, "realm_id": realm_id}
+        try:
+            response = await self._post(url, body)
+            response.raise_for_status()
+            try:
+                return loads(response.content)
+            except json.JSONDecodeError:
+                return {}
+        except HTTPStatusError as exc:
+            print(f"[supabase] insert_with_realm failed for {table}: {exc}")
+            return {}
+
+    async def select_by_realm(
+        self,
+        table: str,
+        realm_id: str,
+        columns: str = "*",
+        limit: Optional[int] = None,
+        raise_errors: bool = False,
+    ) -> List[Dict[str, Any]]:
+        url = f"{self.project_url}/rest/v1/{table}"
+        params = {"select": columns, "realm_id": f"eq.{realm_id}"}
+        if limit is not None:
+            params["limit"] = str(limit)
+        try:
+            response = await self._client().get(url, headers=self._headers(), params=params, timeout=TIMEOUT)
+            response.raise_for_status()
+            try:
+                return loads(response.content)
+            except json.JSONDecodeError:
+                return []
+        except HTTPStatusError as exc:
+            print(f"[supabase] select_by_realm failed for {table}: {exc}")
+            if raise_errors:
+                raise
+            return []
+
+    async def insert_many_with_realm(self, table: str, payloads: List[Dict[str, Any]], realm_id: str) -> bool:
+        """Bulk insert as one multi-row request; PostgREST skips echoing rows back."""
+        if not payloads:
+            return True
+        url = f"{self.project_url}/rest/v1/{table}"
+        body = [{**payload, "realm_id": realm_id} for payload in payloads]
+        headers = {**self._headers(), "Prefer": "return=minimal"}
+        try:
+            response = await self._post(url, body, headers=headers)
+            response.raise_for_status()
+            return True
+        except HTTPStatusError as exc:
+            print(f"[supabase] insert_many_with_realm failed for {table} ({len(body)} rows): {exc}")
+            return False
+
+    async def rpc(self, function_name: str, params: Optional[Dict[str, Any]] = None, raise_errors: bool = False) -> Any:
+        """Call a Postgres function through PostgREST and return its decoded result."""
+        url = f"{self.project_url}/rest/v1/rpc/{function_name}"
+        try:
+            response = await self._post(url, params or {})
+            response.raise_for_status()
+            try:
+                return loads(response.content)
+            except json.JSONDecodeError:
+                return None
+        except HTTPStatusError as exc:
+            print(f"[supabase] RPC {function_name} failed: {exc}")
+            if raise_errors:
+                raise
+            return None
+
+    async def rpc_match_embeddings(
+        self,
+        match_count: int,
+        filter_realm_id: str,
+        embedding: Union[str, Sequence[float]],
+        function_name: str = "match_research_embeddings",
+        raise_errors: bool = False,
+        timeout: float = TIMEOUT,
+        search_params: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        url = f"{self.project_url}/rest/v1/rpc/{function_name}"
+        payload = {
+            # pgvector parses the text literal itself, so skip the JSON float array.
+            "embedding": embedding if isinstance(embedding, str) else pgvector_literal(embedding),
+            "match_count": match_count,
+            "filter_realm_id": filter_realm_id,
+            # Index tuning (ef_search / probes) for functions that accept it, e.g. migration 007.
+            **(search_params or {}),
+        }
+        try:
+            response = await self._post(url, payload, timeout=timeout)
+            response.raise_for_status()
+            try:
+                return loads(response.content)
+            except json.JSONDecodeError:
+                return []
+        except HTTPStatusError as exc:
+            print(f"[supabase] RPC {function_name} failed: {exc}")
+            if raise_errors:
+                raise
+            return []
@@ -1,9 +1,29 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from .routes.recall import router as recall_router
+from .utils.metrics import METRICS
+from .utils.recall_registry import RecallServiceRegistry
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    registry = RecallServiceRegistry()
+    app.state.recall_registry = registry
+    await registry.preload()
+    registry.start()
+    METRICS.add_collector(registry.metric_samples)
+    try:
+        yield
+    finally:
+        METRICS.remove_collector(registry.metric_samples)
+        await registry.aclose()
+
 
-app = FastAPI(title="Aotahi Research Recall Service")
+app = FastAPI(title="Aotahi Research Recall Service", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,3 +39,13 @@ app.include_router(recall_router)
 @app.get("/health")
 def health():
     return {"status": "ok", "service": "recall", "ready": True}
+
+
+@app.get("/stats")
+def stats():
+    return app.state.recall_registry.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
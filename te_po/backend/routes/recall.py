@@ -1,50 +1,189 @@
-from typing import Any, Dict, List, Optional
+import json
+import math
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, List, Optional
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
 
 from ..schema.realms import RealmConfigLoader
-from ..utils.recall_service import RecallService
+from ..utils.admission import AdmissionPermit, AdmissionRejected
+from ..utils.openai_embeddings import EmbeddingUpstreamError
+from ..utils.recall_registry import RecallServiceRegistry
+from ..utils.recall_service import RecallBackendsUnavailable, RecallService
 
 router = APIRouter(tags=["recall"])
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+class RecallFilters(BaseModel):
+    source_ids: Optional[List[str]] = None
+    metadata: Optional[Dict[str, Any]] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
 
 class RecallRequest(BaseModel):
     query: str
     thread_id: Optional[str] = None
     top_k: int = 5
     vector_store: str = "both"
+    include_timings: bool = False
+    filters: Optional[RecallFilters] = None
 
 
 class RecallResponse(BaseModel):
     matches: List[Dict[str, Any]]
     query_tokens: int
     recall_latency_ms: int
+    partial: bool = False
+    backends: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
+    cached: bool = False
+    stale: bool = False
+    cache_age_ms: Optional[int] = None
+    coalesced: bool = False
+    timings: Optional[Dict[str, float]] = None
 
 
-@router.post("/{realm_id}/recall", response_model=RecallResponse)
-async def recall(realm_id: str, request: RecallRequest):
+class RecallBatchRequest(BaseModel):
+    queries: List[RecallRequest]
+    concurrency: Optional[int] = None
+
+
+class RecallBatchResult(BaseModel):
+    query: str
+    response: Optional[RecallResponse] = None
+    error: Optional[str] = None
+
+
+class RecallBatchResponse(BaseModel):
+    results: List[RecallBatchResult]
+    query_tokens: int
+    recall_latency_ms: int
+
+
+def _recall_service(realm_id: str, http_request: Request) -> RecallService:
     try:
         config = RealmConfigLoader.load(realm_id)
     except FileNotFoundError:
         raise HTTPException(status_code=404, detail=f"Realm '{realm_id}' not found")
     if not config.features.get("recall"):
         raise HTTPException(status_code=403, detail="Recall disabled for this realm")
-    service = RecallService(config)
+    registry: RecallServiceRegistry = http_request.app.state.recall_registry
+    return registry.get(config)
+
+
+def _over_capacity(exc: AdmissionRejected) -> HTTPException:
+    return HTTPException(
+        status_code=429,
+        detail={"message": str(exc), "reason": exc.reason},
+        headers={"Retry-After": str(exc.retry_after_s)},
+    )
+
+
+async def _encode_frames(
+    frames: AsyncIterator[Dict[str, Any]],
+    media_type: str,
+    permit: Optional[AdmissionPermit] = None,
+) -> AsyncIterator[str]:
+    try:
+        async for frame in frames:
+            data = json.dumps(frame, default=str)
+            if media_type == SSE_MEDIA_TYPE:
+                yield f"event: {frame['type']}\ndata: {data}\n\n"
+            else:
+                yield data + "\n"
+    except Exception as exc:  # pragma: no cover
+        # Headers are already sent, so failures surface as a final error frame.
+        error = json.dumps({"type": "error", "message": f"Recall failed: {exc}"})
+        yield f"event: error\ndata: {error}\n\n" if media_type == SSE_MEDIA_TYPE else error + "\n"
+    finally:
+        if permit is not None:
+            permit.release()
+
+
+def _stream_media_type(http_request: Request) -> Optional[str]:
+    accept = http_request.headers.get("accept", "")
+    for media_type in (NDJSON_MEDIA_TYPE, SSE_MEDIA_TYPE):
+        if media_type in accept:
+            return media_type
+    return None
+
+
+@router.post("/{realm_id}/recall", response_model=RecallResponse)
+async def recall(realm_id: str, request: RecallRequest, http_request: Request):
+    service = _recall_service(realm_id, http_request)
     payload = {
         "query": request.query,
         "thread_id": request.thread_id,
         "top_k": request.top_k,
         "vector_store": request.vector_store,
+        "include_timings": request.include_timings,
+        "filters": request.filters.dict(exclude_none=True) if request.filters else None,
     }
+    media_type = _stream_media_type(http_request)
+    if media_type is not None:
+        try:
+            permit = await service.admission.acquire()
+        except AdmissionRejected as exc:
+            raise _over_capacity(exc)
+        # The slot is held until the stream ends; the background task covers a
+        # client that disconnects before the body starts.
+        return StreamingResponse(
+            _encode_frames(service.stream(payload), media_type, permit),
+            media_type=media_type,
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+            background=BackgroundTask(permit.release),
+        )
     try:
-        return RecallResponse(**await service.run(payload))
+        async with service.admission.slot():
+            return RecallResponse(**await service.run(payload))
     except HTTPException:
         raise
+    except AdmissionRejected as exc:
+        raise _over_capacity(exc)
+    except RecallBackendsUnavailable as exc:
+        raise HTTPException(status_code=503, detail={"message": str(exc), "backends": exc.backends})
+    except EmbeddingUpstreamError as exc:
+        headers = {"Retry-After": str(max(1, math.ceil(exc.retry_after_s)))} if exc.retry_after_s else None
+        raise HTTPException(status_code=503, detail=f"Embedding service unavailable: {exc}", headers=headers)
     except Exception as exc:  # pragma: no cover
         raise HTTPException(status_code=500, detail=f"Recall failed: {exc}")
 
 
+@router.post("/{realm_id}/recall/batch", response_model=RecallBatchResponse)
+async def recall_batch(realm_id: str, request: RecallBatchRequest, http_request: Request):
+    service = _recall_service(realm_id, http_request)
+    max_queries = int(service.config.recall_config.get("batch_max_queries", 100))
+    if not request.queries:
+        raise HTTPException(status_code=422, detail="At least one query is required")
+    if len(request.queries) > max_queries:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {max_queries} queries for this realm")
+    payloads = [
+        {
+            "query": item.query,
+            "thread_id": item.thread_id,
+            "top_k": item.top_k,
+            "vector_store": item.vector_store,
+            "include_timings": item.include_timings,
+            "filters": item.filters.dict(exclude_none=True) if item.filters else None,
+        }
+        for item in request.queries
+    ]
+    try:
+        # A batch holds one slot; its own fan-out is capped by batch_max_concurrency.
+        async with service.admission.slot():
+            return RecallBatchResponse(**await service.run_batch(payloads, concurrency=request.concurrency))
+    except AdmissionRejected as exc:
+        raise _over_capacity(exc)
+    except Exception as exc:  # pragma: no cover
+        raise HTTPException(status_code=500, detail=f"Batch recall failed: {exc}")
+
+
 @router.get("/{realm_id}/manifest")
 def manifest(realm_id: str):
     try:
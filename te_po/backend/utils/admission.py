@@ -0,0 +1,133 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+
+class AdmissionRejected(RuntimeError):
+    """Raised when a realm is at its concurrency limit and its wait queue is full or too slow."""
+
+    def __init__(self, realm_id: str, reason: str, retry_after_s: int):
+        self.realm_id = realm_id
+        self.reason = reason
+        self.retry_after_s = retry_after_s
+        super().__init__(f"Recall for realm {realm_id} is over capacity ({reason}); retry after {retry_after_s}s")
+
+
+class AdmissionPermit:
+    """One admitted request; ``release`` is idempotent so several cleanup paths can call it."""
+
+    __slots__ = ("_controller", "_acquired_at", "_released")
+
+    def __init__(self, controller: "AdmissionController") -> None:
+        self._controller = controller
+        self._acquired_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._controller._release(time.monotonic() - self._acquired_at)
+
+
+class AdmissionController:
+    """Per-realm concurrency limit with a bounded FIFO wait queue; overflow raises ``AdmissionRejected``."""
+
+    def __init__(self, realm_id: str, max_concurrent: int = 0, max_queue: int = 0, queue_timeout_ms: float = 1000) -> None:
+        self.realm_id = realm_id
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_ms / 1000.0
+        self.active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._mean_hold_s = 0.0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected_queue_full = 0
+        self.rejected_timeout = 0
+
+    @classmethod
+    def from_config(cls, realm_id: str, recall_config: Dict[str, Any]) -> "AdmissionController":
+        settings = recall_config.get("admission") or {}
+        return cls(
+            realm_id,
+            max_concurrent=int(settings.get("max_concurrent", 0)),
+            max_queue=int(settings.get("max_queue", 0)),
+            queue_timeout_ms=float(settings.get("queue_timeout_ms", 1000)),
+        )
+
+    def retry_after_s(self) -> int:
+        if not self.max_concurrent:
+            return 1
+        backlog = (len(self._waiters) + 1) / self.max_concurrent
+        return max(1, math.ceil(self._mean_hold_s * backlog))
+
+    def _reject(self, reason: str) -> AdmissionRejected:
+        if reason == "queue_full":
+            self.rejected_queue_full += 1
+        else:
+            self.rejected_timeout += 1
+        return AdmissionRejected(self.realm_id, reason, self.retry_after_s())
+
+    async def acquire(self) -> AdmissionPermit:
+        if not self.max_concurrent or (self.active < self.max_concurrent and not self._waiters):
+            self.active += 1
+            self.admitted += 1
+            return AdmissionPermit(self)
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full")
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout_s)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we gave up; pass it on.
+                self._release(None)
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(exc, asyncio.TimeoutError):
+                raise self._reject("queue_timeout")
+            raise
+        self.admitted += 1
+        return AdmissionPermit(self)
+
+    def _release(self, held_s: Optional[float]) -> None:
+        if held_s is not None:
+            self._mean_hold_s = held_s if not self._mean_hold_s else 0.9 * self._mean_hold_s + 0.1 * held_s
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # Hand the slot straight to the next waiter; ``active`` is unchanged.
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[AdmissionPermit]:
+        permit = await self.acquire()
+        try:
+            yield permit
+        finally:
+            permit.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "queue_timeout_ms": self.queue_timeout_s * 1000.0,
+            "active": self.active,
+            "queue_depth": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_timeout": self.rejected_timeout,
+            "mean_hold_ms": round(self._mean_hold_s * 1000.0, 2),
+        }
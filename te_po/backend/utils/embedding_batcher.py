@@ -0,0 +1,99 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+EmbedMany = Callable[[List[str]], Awaitable[List[Dict[str, Any]]]]
+
+
+def estimate_tokens(text: str) -> int:
+    # Rough tiktoken-free estimate (~4 chars per token) used for batch budgets
+    # and for apportioning a batch's usage.prompt_tokens across its inputs.
+    return max(1, len(text) // 4)
+
+
+def apportion_tokens(texts: List[str], total_tokens: Optional[int]) -> List[int]:
+    """Split a batch-level token count across inputs by length, summing exactly to ``total_tokens``."""
+    estimates = [estimate_tokens(text) for text in texts]
+    if not total_tokens:
+        return estimates
+    weight = sum(estimates)
+    shares = [total_tokens * estimate // weight for estimate in estimates]
+    remainder = total_tokens - sum(shares)
+    for index in sorted(range(len(texts)), key=lambda i: -estimates[i])[:remainder]:
+        shares[index] += 1
+    return shares
+
+
+class EmbeddingBatcher:
+    """Coalesce concurrent single-text embed calls into one ``embed_many`` request."""
+
+    def __init__(
+        self,
+        embed_many: EmbedMany,
+        window_ms: float = 5.0,
+        max_batch: int = 64,
+        max_tokens: int = 8000,
+    ) -> None:
+        self.embed_many = embed_many
+        self.window_s = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.max_tokens = max_tokens
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._pending_tokens = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight: Set[asyncio.Task] = set()
+        self.batches = 0
+        self.inputs = 0
+        self.largest_batch = 0
+
+    async def submit(self, text: str) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        tokens = estimate_tokens(text)
+        if self._pending and self._pending_tokens + tokens > self.max_tokens:
+            self._flush()
+        self._pending.append((text, future))
+        self._pending_tokens += tokens
+        if len(self._pending) >= self.max_batch or self._pending_tokens >= self.max_tokens:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_s, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: List[Tuple[str, asyncio.Future]]) -> None:
+        self.batches += 1
+        self.inputs += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        try:
+            results = await self.embed_many([text for text, _ in batch])
+            if len(results) != len(batch):
+                raise RuntimeError(f"Embedding batch returned {len(results)} vectors for {len(batch)} inputs")
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "window_ms": self.window_s * 1000.0,
+            "max_batch": self.max_batch,
+            "max_tokens": self.max_tokens,
+            "batches": self.batches,
+            "inputs": self.inputs,
+            "largest_batch": self.largest_batch,
+            "mean_batch": round(self.inputs / self.batches, 2) if self.batches else 0.0,
+        }
@@ -0,0 +1,77 @@
+import os
+import time
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+CacheKey = Tuple[str, Optional[int], str]
+
+
+def normalise_query(text: str) -> str:
+    """Canonical form used for cache keys: NFC (one key for macronised vowels), case-folded, single-spaced."""
+    return " ".join(unicodedata.normalize("NFC", text).casefold().split())
+
+
+class EmbeddingCache:
+    """Bounded LRU cache for query embeddings (packed float32) with an optional TTL."""
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None) -> None:
+        if max_entries is None:
+            max_entries = int(os.getenv("RECALL_EMBED_CACHE_SIZE", "1024"))
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv("RECALL_EMBED_CACHE_TTL", "3600"))
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[CacheKey, Tuple[float, array, int]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def key(model: str, dimensions: Optional[int], text: str) -> CacheKey:
+        return (model, dimensions, normalise_query(text))
+
+    def get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        stored_at, vector, prompt_tokens = entry
+        if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        # Callers only read the vector, so hand out the stored array rather than a list copy.
+        return {"embedding": vector, "prompt_tokens": prompt_tokens}
+
+    def put(self, key: CacheKey, embedding: Sequence[float], prompt_tokens: int) -> None:
+        if self.max_entries <= 0:
+            return
+        if not (isinstance(embedding, array) and embedding.typecode == "f"):
+            embedding = array("f", embedding)
+        self._entries[key] = (time.monotonic(), embedding, prompt_tokens)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
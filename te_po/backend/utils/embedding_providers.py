@@ -0,0 +1,214 @@
+import abc
+import asyncio
+import hashlib
+import math
+import os
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from .embedding_batcher import apportion_tokens, estimate_tokens
+from .embedding_cache import normalise_query
+from .http_pool import HttpClientPool
+from .openai_embeddings import EmbeddingRateLimits, OpenAIEmbeddingClient
+from .vector_codec import decode_embedding
+
+EMBEDDING_PROVIDERS = {"openai", "local", "deterministic"}
+DEFAULT_OPENAI_MODEL = "text-embedding-3-large"
+DEFAULT_LOCAL_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_DETERMINISTIC_DIMENSIONS = 1536
+
+
+class EmbeddingProvider(abc.ABC):
+    """Turns texts into packed float32 vectors for one realm; ``model`` is part of the cache key."""
+
+    name = "base"
+
+    def __init__(self, model: str, dimensions: Optional[int]) -> None:
+        self.model = model
+        self.dimensions = dimensions
+        self.calls = 0
+        self.inputs = 0
+
+    @abc.abstractmethod
+    async def embed_many(self, texts: List[str]) -> List[Dict[str, Any]]:
+        ...
+
+    def stats(self) -> Dict[str, Any]:
+        return {"provider": self.name, "model": self.model, "calls": self.calls, "inputs": self.inputs}
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """Embeddings API over the pooled, rate-limited ``OpenAIEmbeddingClient``."""
+
+    name = "openai"
+
+    def __init__(
+        self,
+        model: str,
+        dimensions: Optional[int],
+        client: OpenAIEmbeddingClient,
+        request_dimensions: bool = True,
+    ) -> None:
+        super().__init__(model, dimensions)
+        self.client = client
+        self.request_dimensions = request_dimensions
+
+    async def embed_many(self, texts: List[str]) -> List[Dict[str, Any]]:
+        if not self.client.api_key:
+            raise RuntimeError("OpenAI key missing for recall service")
+        body = {
+            "model": self.model,
+            "input": texts[0] if len(texts) == 1 else texts,
+            # base64 float32 is ~4 bytes/dim on the wire vs ~20 for JSON floats, and decodes without parsing.
+            "encoding_format": "base64",
+        }
+        # Only the text-embedding-3 family accepts `dimensions`; others return their native size.
+        if self.dimensions and self.request_dimensions and self.model.startswith("text-embedding-3"):
+            body["dimensions"] = self.dimensions
+        self.calls += 1
+        self.inputs += len(texts)
+        payload = await self.client.embed(body, sum(estimate_tokens(text) for text in texts))
+        data = sorted(payload["data"], key=lambda item: item.get("index", 0))
+        prompt_tokens = payload.get("usage", {}).get("prompt_tokens")
+        if len(texts) == 1:
+            token_counts = [prompt_tokens if prompt_tokens is not None else len(texts[0].split())]
+        else:
+            token_counts = apportion_tokens(texts, prompt_tokens)
+        return [
+            {"embedding": decode_embedding(item["embedding"]), "prompt_tokens": tokens}
+            for item, tokens in zip(data, token_counts)
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), **self.client.stats()}
+
+
+class LocalEmbeddingProvider(EmbeddingProvider):
+    """Sentence-transformers model run on CPU in a shared thread pool, loaded once per process."""
+
+    name = "local"
+    _models: Dict[str, Any] = {}
+    _models_lock = threading.Lock()
+    _executor: Optional[ThreadPoolExecutor] = None
+
+    def __init__(self, model: str, dimensions: Optional[int], device: str = "cpu", batch_size: int = 32) -> None:
+        super().__init__(model, dimensions)
+        self.device = device
+        self.batch_size = batch_size
+
+    @classmethod
+    def _pool(cls) -> ThreadPoolExecutor:
+        if cls._executor is None:
+            workers = int(os.getenv("RECALL_LOCAL_EMBED_THREADS", "2"))
+            cls._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="local-embed")
+        return cls._executor
+
+    def _load(self) -> Any:
+        key = f"{self.model}@{self.device}"
+        with self._models_lock:
+            model = self._models.get(key)
+            if model is None:
+                try:
+                    from sentence_transformers import SentenceTransformer
+                except ImportError as exc:
+                    raise RuntimeError(
+                        "recall_config.embedding_provider 'local' needs the sentence-transformers package"
+                    ) from exc
+                print(f"[recall] loading local embedding model {self.model} on {self.device}")
+                model = self._models[key] = SentenceTransformer(self.model, device=self.device)
+        return model
+
+    def _encode(self, texts: List[str]) -> List[array]:
+        model = self._load()
+        matrix = model.encode(
+            texts,
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False,
+        )
+        vectors = []
+        for row in matrix:
+            vector = array("f")
+            vector.frombytes(row.astype("float32").tobytes())
+            vectors.append(vector)
+        return vectors
+
+    async def embed_many(self, texts: List[str]) -> List[Dict[str, Any]]:
+        self.calls += 1
+        self.inputs += len(texts)
+        loop = asyncio.get_running_loop()
+        vectors = await loop.run_in_executor(self._pool(), self._encode, texts)
+        return [{"embedding": vector, "prompt_tokens": estimate_tokens(text)} for text, vector in zip(texts, vectors)]
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "device": self.device, "loaded": f"{self.model}@{self.device}" in self._models}
+
+
+class DeterministicEmbeddingProvider(EmbeddingProvider):
+    """Offline signed feature-hashing embedder for benchmarks and tests."""
+
+    name = "deterministic"
+
+    def __init__(self, model: str, dimensions: Optional[int]) -> None:
+        super().__init__(model, dimensions or DEFAULT_DETERMINISTIC_DIMENSIONS)
+
+    def _vector(self, text: str) -> array:
+        buckets: Dict[int, float] = {}
+        for token in normalise_query(text).split():
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            buckets[bucket] = buckets.get(bucket, 0.0) + (1.0 if digest[4] & 1 else -1.0)
+        vector = array("f", bytes(4 * self.dimensions))
+        norm = math.sqrt(sum(value * value for value in buckets.values()))
+        for bucket, value in buckets.items():
+            if norm:
+                vector[bucket] = value / norm
+        return vector
+
+    async def embed_many(self, texts: List[str]) -> List[Dict[str, Any]]:
+        self.calls += 1
+        self.inputs += len(texts)
+        return [{"embedding": self._vector(text), "prompt_tokens": estimate_tokens(text)} for text in texts]
+
+
+def create_embedding_provider(
+    config,
+    dimensions: Optional[int],
+    http_pool: Optional[HttpClientPool] = None,
+    rate_limits: Optional[EmbeddingRateLimits] = None,
+) -> EmbeddingProvider:
+    """Build the provider named by ``recall_config.embedding_provider`` (default ``openai``)."""
+    recall_cfg = config.recall_config
+    kind = recall_cfg.get("embedding_provider", "openai")
+    if kind not in EMBEDDING_PROVIDERS:
+        raise ValueError(f"recall_config.embedding_provider must be one of {sorted(EMBEDDING_PROVIDERS)}")
+    if kind == "local":
+        return LocalEmbeddingProvider(
+            recall_cfg.get("embedding_model", DEFAULT_LOCAL_MODEL),
+            dimensions,
+            device=recall_cfg.get("embedding_device", "cpu"),
+            batch_size=int(recall_cfg.get("embedding_batch_size", 32)),
+        )
+    if kind == "deterministic":
+        # Fixed model name so hashed vectors never share cache entries with a real model.
+        return DeterministicEmbeddingProvider("deterministic-hash", dimensions)
+    base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+    model = recall_cfg.get("embedding_model", DEFAULT_OPENAI_MODEL)
+    client = OpenAIEmbeddingClient(
+        base_url,
+        os.getenv("OPENAI_API_KEY"),
+        rate_limiter=rate_limits.get(base_url, model) if rate_limits else None,
+        http_pool=http_pool,
+        realm_id=config.realm_id,
+        max_retries=recall_cfg.get("embed_max_retries"),
+        deadline_ms=recall_cfg.get("embed_deadline_ms"),
+    )
+    return OpenAIEmbeddingProvider(
+        model,
+        dimensions,
+        client,
+        request_dimensions=recall_cfg.get("embedding_truncation", "api") == "api",
+    )
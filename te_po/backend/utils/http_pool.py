@@ -0,0 +1,119 @@
+import os
+from functools import partial
+from typing import Any, Dict, Optional
+
+import httpx
+
+TIMEOUT = 30.0
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+def origin(url: str) -> str:
+    """``scheme://host:port`` of ``url``, with the scheme's default port filled in."""
+    parsed = httpx.URL(url)
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    return f"{parsed.scheme}://{parsed.host}:{port}"
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class PoolSettings:
+    """Connection pool limits shared by every long-lived recall HTTP client (``RECALL_HTTP_*``)."""
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        timeout: Optional[float] = None,
+        http2: Optional[bool] = None,
+    ) -> None:
+        self.max_connections = max_connections or _env_int("RECALL_HTTP_MAX_CONNECTIONS", 100)
+        self.max_keepalive_connections = max_keepalive_connections or _env_int("RECALL_HTTP_MAX_KEEPALIVE", 20)
+        self.keepalive_expiry = keepalive_expiry or _env_float("RECALL_HTTP_KEEPALIVE_EXPIRY", 30.0)
+        self.timeout = timeout or _env_float("RECALL_HTTP_TIMEOUT", TIMEOUT)
+        if http2 is None:
+            http2 = os.getenv("RECALL_HTTP2", "0").lower() in {"1", "true", "yes"}
+        if http2 and not _http2_available():
+            print("[http_pool] RECALL_HTTP2 requested but 'h2' is not installed; using HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def dict(self) -> Dict[str, Any]:
+        return {
+            "max_connections": self.max_connections,
+            "max_keepalive_connections": self.max_keepalive_connections,
+            "keepalive_expiry": self.keepalive_expiry,
+            "timeout": self.timeout,
+            "http2": self.http2,
+        }
+
+
+class HttpClientPool:
+    """Long-lived ``httpx.AsyncClient`` instances keyed by upstream origin; callers send absolute URLs."""
+
+    def __init__(self, settings: Optional[PoolSettings] = None) -> None:
+        self.settings = settings or PoolSettings()
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def get(self, url: str) -> httpx.AsyncClient:
+        key = origin(url)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            counts = self._counts.setdefault(key, {"requests": 0, "responses": 0, "http2_responses": 0})
+            client = httpx.AsyncClient(
+                limits=self.settings.limits(),
+                timeout=self.settings.timeout,
+                http2=self.settings.http2,
+                event_hooks={
+                    "request": [partial(self._count_request, counts)],
+                    "response": [partial(self._count_response, counts)],
+                },
+            )
+            self._clients[key] = client
+        return client
+
+    async def aclose(self) -> None:
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.aclose()
+
+    @staticmethod
+    async def _count_request(counts: Dict[str, int], request: httpx.Request) -> None:
+        counts["requests"] += 1
+
+    @staticmethod
+    async def _count_response(counts: Dict[str, int], response: httpx.Response) -> None:
+        counts["responses"] += 1
+        if response.http_version == "HTTP/2":
+            counts["http2_responses"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "settings": self.settings.dict(),
+            "clients": {origin: dict(counts) for origin, counts in self._counts.items()},
+        }
@@ -0,0 +1,302 @@
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .recall_filters import filters_key, json_contains, utc_naive
+
+SCAN_BLOCK_ROWS = 65536
+KMEANS_ITERATIONS = 12
+KMEANS_SAMPLE_ROWS = 200000
+FILTER_CACHE_SIZE = 64
+METADATA_BITMAP_MAX_VALUES = 256
+ROW_COLUMNS = (
+    "chunk_ids",
+    "source_codes",
+    "created_at",
+    "content",
+    "content_offsets",
+    "metadata",
+    "metadata_offsets",
+    "metadata_bits",
+)
+NO_TIMESTAMP = np.iinfo(np.int64).min
+_EPOCH = datetime(1970, 1, 1)
+
+
+def _normalise_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first, via argpartition (O(n))."""
+    if k >= scores.shape[0]:
+        return np.argsort(-scores)
+    candidates = np.argpartition(-scores, k - 1)[:k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+def _kmeans(vectors: np.ndarray, lists: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    sample = vectors
+    if vectors.shape[0] > KMEANS_SAMPLE_ROWS:
+        sample = vectors[rng.choice(vectors.shape[0], KMEANS_SAMPLE_ROWS, replace=False)]
+    centroids = sample[rng.choice(sample.shape[0], lists, replace=False)].astype(np.float32)
+    for _ in range(KMEANS_ITERATIONS):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        for index in range(lists):
+            members = sample[assign == index]
+            if len(members):
+                centroids[index] = members.mean(axis=0)
+        centroids = _normalise_rows(centroids)
+    return centroids
+
+
+def _timestamp_us(value: Any) -> int:
+    if not value:
+        return NO_TIMESTAMP
+    return (utc_naive(value) - _EPOCH) // timedelta(microseconds=1)
+
+
+def _pack_text(values: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """UTF-8 strings as one byte array plus ``len + 1`` offsets."""
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(item) for item in encoded])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _scalar_key(value: Any) -> Optional[str]:
+    """Canonical JSON for a scalar metadata value (``1`` and ``1.0`` agree, as in JSONB); ``None`` otherwise."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = float(value)
+    elif not (value is None or isinstance(value, (bool, str))):
+        return None
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _metadata_bitmaps(rows: Sequence[Dict[str, Any]]) -> Tuple[np.ndarray, List[List[str]]]:
+    """One packed bit row per scalar metadata ``[key, value]`` pair, for keys with few distinct values."""
+    members: Dict[Tuple[str, str], List[int]] = {}
+    for index, row in enumerate(rows):
+        metadata = row.get("metadata")
+        if isinstance(metadata, dict):
+            for key, value in metadata.items():
+                canonical = _scalar_key(value)
+                if canonical is not None:
+                    members.setdefault((key, canonical), []).append(index)
+    values_per_key: Dict[str, int] = {}
+    for key, _ in members:
+        values_per_key[key] = values_per_key.get(key, 0) + 1
+    pairs = [pair for pair in members if values_per_key[pair[0]] <= METADATA_BITMAP_MAX_VALUES]
+    bits = np.zeros((len(pairs), (len(rows) + 7) // 8), dtype=np.uint8)
+    for position, pair in enumerate(pairs):
+        mask = np.zeros(len(rows), dtype=bool)
+        mask[members[pair]] = True
+        bits[position] = np.packbits(mask)
+    return bits, [list(pair) for pair in pairs]
+
+
+def build_snapshot(
+    path: Path,
+    rows: Sequence[Dict[str, Any]],
+    vectors: np.ndarray,
+    dtype: str = "float32",
+    ivf_lists: int = 0,
+) -> Path:
+    """Write a realm snapshot of ``.npy`` columns that ``LocalVectorIndex.load`` can memory-map."""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    matrix = _normalise_rows(np.asarray(vectors, dtype=np.float32))
+    rows = list(rows)
+    if len(rows) != matrix.shape[0]:
+        raise ValueError(f"{len(rows)} rows but {matrix.shape[0]} vectors")
+    if ivf_lists > 0:
+        ivf_lists = min(ivf_lists, matrix.shape[0])
+        centroids = _kmeans(matrix, ivf_lists)
+        assign = np.concatenate(
+            [np.argmax(matrix[i:i + SCAN_BLOCK_ROWS] @ centroids.T, axis=1) for i in range(0, matrix.shape[0], SCAN_BLOCK_ROWS)]
+        )
+        order = np.argsort(assign, kind="stable")
+        matrix = matrix[order]
+        rows = [rows[i] for i in order]
+        offsets = np.searchsorted(assign[order], np.arange(ivf_lists + 1))
+        np.save(path / "ivf_centroids.npy", centroids.astype(np.float32))
+        np.save(path / "ivf_offsets.npy", offsets.astype(np.int64))
+    np.save(path / "embeddings.npy", matrix.astype(dtype))
+    sources: Dict[str, int] = {}
+    codes = [-1 if row.get("source_id") is None else sources.setdefault(row["source_id"], len(sources)) for row in rows]
+    content, content_offsets = _pack_text(row.get("content") or "" for row in rows)
+    metadata, metadata_offsets = _pack_text(json.dumps(row.get("metadata"), ensure_ascii=False) for row in rows)
+    metadata_bits, metadata_pairs = _metadata_bitmaps(rows)
+    columns = {
+        "chunk_ids": np.array([row.get("chunk_id") or "" for row in rows], dtype=str),
+        "source_codes": np.array(codes, dtype=np.int32),
+        "created_at": np.array([_timestamp_us(row.get("created_at")) for row in rows], dtype=np.int64),
+        "content": content,
+        "content_offsets": content_offsets,
+        "metadata": metadata,
+        "metadata_offsets": metadata_offsets,
+        "metadata_bits": metadata_bits,
+    }
+    for name, column in columns.items():
+        np.save(path / f"{name}.npy", column)
+    vocabulary = {"sources": list(sources), "metadata_pairs": metadata_pairs}
+    (path / "vocabulary.json").write_text(json.dumps(vocabulary, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+class LocalVectorIndex:
+    """In-process top-k cosine search over a memory-mapped realm snapshot."""
+
+    def __init__(
+        self,
+        matrix: np.ndarray,
+        columns: Dict[str, np.ndarray],
+        vocabulary: Dict[str, Any],
+        centroids: Optional[np.ndarray] = None,
+        offsets: Optional[np.ndarray] = None,
+        mode: str = "exact",
+        nprobe: int = 8,
+    ) -> None:
+        if mode == "ivf" and centroids is None:
+            raise ValueError("IVF mode requested but the snapshot has no ivf_centroids.npy")
+        self.matrix = matrix
+        self.columns = columns
+        self.sources: List[str] = vocabulary["sources"]
+        self._source_codes = {source_id: code for code, source_id in enumerate(self.sources)}
+        self._metadata_pairs = {tuple(pair): position for position, pair in enumerate(vocabulary["metadata_pairs"])}
+        self._bitmap_keys = {key for key, _ in self._metadata_pairs}
+        self.centroids = centroids
+        self.offsets = offsets
+        self.mode = mode
+        self.nprobe = nprobe
+        self._filtered_rows: Dict[str, np.ndarray] = {}
+
+    @classmethod
+    def load(cls, path: Path, mode: str = "exact", nprobe: int = 8) -> "LocalVectorIndex":
+        path = Path(path)
+        matrix = np.load(path / "embeddings.npy", mmap_mode="r")
+        columns = {name: np.load(path / f"{name}.npy", mmap_mode="r") for name in ROW_COLUMNS}
+        vocabulary = json.loads((path / "vocabulary.json").read_text(encoding="utf-8"))
+        centroids = offsets = None
+        if (path / "ivf_centroids.npy").exists():
+            centroids = np.load(path / "ivf_centroids.npy")
+            offsets = np.load(path / "ivf_offsets.npy")
+        return cls(matrix, columns, vocabulary, centroids=centroids, offsets=offsets, mode=mode, nprobe=nprobe)
+
+    @property
+    def dimensions(self) -> int:
+        return int(self.matrix.shape[1])
+
+    def __len__(self) -> int:
+        return int(self.matrix.shape[0])
+
+    def _text(self, name: str, index: int) -> str:
+        offsets = self.columns[f"{name}_offsets"]
+        return bytes(self.columns[name][offsets[index]:offsets[index + 1]]).decode("utf-8")
+
+    def row(self, index: int) -> Dict[str, Any]:
+        code = int(self.columns["source_codes"][index])
+        created_at = int(self.columns["created_at"][index])
+        return {
+            "chunk_id": str(self.columns["chunk_ids"][index]) or None,
+            "source_id": self.sources[code] if code >= 0 else None,
+            "content": self._text("content", index),
+            "metadata": json.loads(self._text("metadata", index)),
+            "created_at": None if created_at == NO_TIMESTAMP else _EPOCH + timedelta(microseconds=created_at),
+        }
+
+    def _scan(self, query: np.ndarray, start: int, stop: int, k: int) -> List[tuple]:
+        best: List[tuple] = []
+        for block_start in range(start, stop, SCAN_BLOCK_ROWS):
+            block = np.asarray(self.matrix[block_start:min(block_start + SCAN_BLOCK_ROWS, stop)], dtype=np.float32)
+            scores = block @ query
+            for index in _top_k(scores, k):
+                best.append((float(scores[index]), block_start + int(index)))
+        return best
+
+    def _filter_candidates(self, filters: Dict[str, Any]) -> np.ndarray:
+        mask = np.ones(len(self), dtype=bool)
+        if "source_ids" in filters:
+            codes = [self._source_codes[source_id] for source_id in filters["source_ids"] if source_id in self._source_codes]
+            mask &= np.isin(self.columns["source_codes"], codes)
+        if "created_after" in filters:
+            mask &= self.columns["created_at"] >= _timestamp_us(filters["created_after"])
+        if "created_before" in filters:
+            created_at = self.columns["created_at"]
+            mask &= (created_at != NO_TIMESTAMP) & (created_at < _timestamp_us(filters["created_before"]))
+        residual: Dict[str, Any] = {}
+        for key, value in (filters.get("metadata") or {}).items():
+            canonical = _scalar_key(value)
+            if canonical is None or key not in self._bitmap_keys:
+                residual[key] = value
+                continue
+            position = self._metadata_pairs.get((key, canonical))
+            if position is None:
+                # Every scalar value of a bitmapped key has a pair, so nothing matches.
+                return np.zeros(0, dtype=np.int64)
+            mask &= np.unpackbits(self.columns["metadata_bits"][position], count=len(self)).view(bool)
+        indices = np.flatnonzero(mask)
+        if residual:
+            indices = indices[
+                [json_contains(json.loads(self._text("metadata", int(index))) or {}, residual) for index in indices]
+            ]
+        return indices
+
+    def _rows_matching(self, filters: Dict[str, Any]) -> np.ndarray:
+        """Row indices passing ``filters``, remembered per filter set (bounded, oldest evicted)."""
+        key = filters_key(filters)
+        indices = self._filtered_rows.get(key)
+        if indices is None:
+            indices = self._filter_candidates(filters)
+            if len(self._filtered_rows) >= FILTER_CACHE_SIZE:
+                self._filtered_rows.pop(next(iter(self._filtered_rows)))
+            self._filtered_rows[key] = indices
+        return indices
+
+    def _scan_rows(self, query: np.ndarray, indices: np.ndarray, k: int) -> List[tuple]:
+        best: List[tuple] = []
+        for block_start in range(0, len(indices), SCAN_BLOCK_ROWS):
+            block_rows = indices[block_start:block_start + SCAN_BLOCK_ROWS]
+            scores = np.asarray(self.matrix[block_rows], dtype=np.float32) @ query
+            for index in _top_k(scores, k):
+                best.append((float(scores[index]), int(block_rows[index])))
+        return best
+
+    def search(
+        self, embedding: Sequence[float], top_k: int, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        query = np.asarray(embedding, dtype=np.float32)
+        if query.shape[0] != self.dimensions:
+            raise ValueError(f"Query has {query.shape[0]} dims but local index has {self.dimensions}")
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        if filters:
+            candidates = self._scan_rows(query, self._rows_matching(filters), top_k)
+        elif self.mode == "ivf":
+            probes = _top_k(self.centroids @ query, min(self.nprobe, self.centroids.shape[0]))
+            candidates: List[tuple] = []
+            for list_id in probes:
+                candidates.extend(self._scan(query, int(self.offsets[list_id]), int(self.offsets[list_id + 1]), top_k))
+        else:
+            candidates = self._scan(query, 0, len(self), top_k)
+        candidates.sort(key=lambda item: -item[0])
+        matches = []
+        for score, row_index in candidates[:top_k]:
+            row = self.row(row_index)
+            matches.append(
+                {
+                    "chunk_id": row.get("chunk_id"),
+                    "source_id": row.get("source_id"),
+                    "content": row.get("content"),
+                    "similarity": score,
+                    "metadata": row.get("metadata"),
+                }
+            )
+        return matches
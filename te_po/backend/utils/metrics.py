@@ -0,0 +1,203 @@
+import abc
+import bisect
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric(abc.ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+
+    def _key(self, labels: Sequence[str]) -> LabelValues:
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"{self.name} expects labels {self.label_names}")
+        return tuple(str(label) for label in labels)
+
+    @abc.abstractmethod
+    def samples(self) -> Iterable[Sample]:
+        ...
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> Iterable[Sample]:
+        for key, value in self._values.items():
+            yield self.name, dict(zip(self.label_names, key)), value
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> None:
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def samples(self) -> Iterable[Sample]:
+        for key, value in self._values.items():
+            yield self.name, dict(zip(self.label_names, key)), value
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram; ``observe`` is a bisect plus two adds."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[LabelValues, List[int]] = {}
+        self._sums: Dict[LabelValues, float] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        key = self._key(labels)
+        counts = self._counts.get(key)
+        if counts is None:
+            counts = self._counts[key] = [0] * (len(self.buckets) + 1)
+            self._sums[key] = 0.0
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[key] += value
+
+    def samples(self) -> Iterable[Sample]:
+        for key, counts in self._counts.items():
+            labels = dict(zip(self.label_names, key))
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, running
+            yield f"{self.name}_count", labels, running
+            yield f"{self.name}_sum", labels, self._sums[key]
+
+
+Collector = Callable[[], Iterable[Tuple[str, str, str, Dict[str, str], float]]]
+
+
+class MetricsRegistry:
+    """Holds metrics and collectors and renders them in the Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Collector] = []
+
+    def _register(self, metric: _Metric) -> _Metric:
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, label_names))
+
+    def gauge(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, label_names))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Optional[Sequence[float]] = None,
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, label_names, buckets or DEFAULT_BUCKETS))
+
+    def add_collector(self, collector: Collector) -> None:
+        self._collectors.append(collector)
+
+    def remove_collector(self, collector: Collector) -> None:
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        described = set()
+        for collector in self._collectors:
+            for name, kind, help_text, labels, value in collector():
+                if name not in described:
+                    lines.append(f"# HELP {name} {help_text}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    described.add(name)
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+RECALL_STAGE_SECONDS = METRICS.histogram(
+    "recall_stage_seconds",
+    "Recall latency per realm and stage (embed, search_<backend>, merge, log, total).",
+    ("realm", "stage"),
+)
+RECALL_REQUESTS = METRICS.counter(
+    "recall_requests_total",
+    "Recall requests by realm and outcome.",
+    ("realm", "outcome"),
+)
+RECALL_IN_FLIGHT = METRICS.gauge(
+    "recall_in_flight_requests",
+    "Recall requests currently being served.",
+    ("realm",),
+)
+RECALL_UPSTREAM_ERRORS = METRICS.counter(
+    "recall_upstream_errors_total",
+    "Failed upstream calls by realm, upstream and kind (timeout, error, rate_limited, circuit_open).",
+    ("realm", "upstream", "kind"),
+)
+RECALL_COALESCED = METRICS.counter(
+    "recall_coalesced_requests_total",
+    "Recall requests served by joining an identical in-flight computation.",
+    ("realm",),
+)
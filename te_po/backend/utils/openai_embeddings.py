@@ -0,0 +1,241 @@
+import asyncio
+import os
+import random
+import re
+import time
+from typing import Any, Dict, Mapping, Optional
+
+import httpx
+
+from .http_pool import HttpClientPool
+from .metrics import RECALL_UPSTREAM_ERRORS
+from .vector_codec import dumps, loads
+
+RETRYABLE_STATUSES = {408, 409, 429, 500, 502, 503, 504}
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_SCALE = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """Seconds from an ``x-ratelimit-reset-*`` value such as ``"20ms"``, ``"1.5s"`` or ``"6m0s"``."""
+    if not value:
+        return None
+    parts = _DURATION_PART.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(number) * _DURATION_SCALE[unit] for number, unit in parts)
+
+
+def retry_after(headers: Mapping[str, str]) -> Optional[float]:
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000.0
+        except ValueError:
+            pass
+    try:
+        return float(headers["retry-after"]) if headers.get("retry-after") else None
+    except ValueError:
+        return None  # HTTP-date form; fall back to backoff
+
+
+class EmbeddingUpstreamError(RuntimeError):
+    """The embeddings API kept failing (or rate limiting) until the retry budget ran out."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after_s: Optional[float] = None):
+        self.status_code = status_code
+        self.retry_after_s = retry_after_s
+        super().__init__(message)
+
+
+class TokenBucket:
+    """Per-minute budget refilled continuously; ``reserve`` may go into debt and returns the wait."""
+
+    def __init__(self, per_minute: float) -> None:
+        self.capacity = float(per_minute)
+        self.level = float(per_minute)
+        self._updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        return self.capacity / 60.0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        self._refill()
+        self.level -= min(amount, self.capacity)
+        return 0.0 if self.level >= 0 else -self.level / self.rate
+
+    def refund(self, amount: float) -> None:
+        self._refill()
+        self.level = min(self.capacity, self.level + min(amount, self.capacity))
+
+    def observe(self, limit: Optional[float], remaining: Optional[float], reset_s: Optional[float]) -> None:
+        """Adopt the server's view: its limit, and never more headroom than it reports."""
+        self._refill()
+        if limit:
+            self.capacity = float(limit)
+        if remaining is not None:
+            self.level = min(self.level, float(remaining))
+            if remaining <= 0 and reset_s:
+                self.level = min(self.level, -reset_s * self.rate)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute pacing for one API key and model."""
+
+    def __init__(self, rpm: float, tpm: float) -> None:
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.waits = 0
+        self.waited_s = 0.0
+
+    async def acquire(self, tokens: int, deadline: float) -> None:
+        wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        if wait <= 0:
+            return
+        if time.monotonic() + wait > deadline:
+            self.requests.refund(1)
+            self.tokens.refund(tokens)
+            raise EmbeddingUpstreamError("Embedding rate limit budget exhausted before deadline", 429, wait)
+        self.waits += 1
+        self.waited_s += wait
+        await asyncio.sleep(wait)
+
+    def observe(self, headers: Mapping[str, str]) -> None:
+        for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+            limit = headers.get(f"x-ratelimit-limit-{kind}")
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if limit is None and remaining is None:
+                continue
+            try:
+                bucket.observe(
+                    float(limit) if limit else None,
+                    float(remaining) if remaining else None,
+                    parse_reset(headers.get(f"x-ratelimit-reset-{kind}")),
+                )
+            except ValueError:
+                continue
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rpm": self.requests.capacity,
+            "tpm": self.tokens.capacity,
+            "requests_available": round(self.requests.level, 1),
+            "tokens_available": round(self.tokens.level, 1),
+            "waits": self.waits,
+            "waited_ms": round(self.waited_s * 1000.0, 1),
+        }
+
+
+class EmbeddingRateLimits:
+    """Shared ``RateLimiter`` per (base URL, model): OpenAI limits are per key and model, not per realm."""
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None) -> None:
+        self.rpm = rpm or float(os.getenv("RECALL_OPENAI_RPM", "3000"))
+        self.tpm = tpm or float(os.getenv("RECALL_OPENAI_TPM", "1000000"))
+        self._limiters: Dict[str, RateLimiter] = {}
+
+    def get(self, base_url: str, model: str) -> RateLimiter:
+        key = f"{base_url.rstrip('/')}#{model}"
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            limiter = self._limiters[key] = RateLimiter(self.rpm, self.tpm)
+        return limiter
+
+    def stats(self) -> Dict[str, Any]:
+        return {key: limiter.stats() for key, limiter in self._limiters.items()}
+
+
+class OpenAIEmbeddingClient:
+    """POST /embeddings with proactive pacing and bounded, jittered retries."""
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: Optional[str],
+        rate_limiter: Optional[RateLimiter] = None,
+        http_pool: Optional[HttpClientPool] = None,
+        realm_id: str = "",
+        max_retries: Optional[int] = None,
+        deadline_ms: Optional[float] = None,
+        backoff_base_ms: Optional[float] = None,
+        backoff_max_ms: Optional[float] = None,
+    ) -> None:
+        self.base_url = base_url
+        self.api_key = api_key
+        self.rate_limiter = rate_limiter
+        self.http_pool = http_pool
+        self.realm_id = realm_id
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("RECALL_OPENAI_MAX_RETRIES", "4"))
+        self.deadline_s = (deadline_ms or float(os.getenv("RECALL_OPENAI_DEADLINE_MS", "10000"))) / 1000.0
+        self.backoff_base_s = (backoff_base_ms or float(os.getenv("RECALL_OPENAI_BACKOFF_BASE_MS", "250"))) / 1000.0
+        self.backoff_max_s = (backoff_max_ms or float(os.getenv("RECALL_OPENAI_BACKOFF_MAX_MS", "8000"))) / 1000.0
+        self.retries = 0
+        self.throttled = 0
+
+    async def _post(self, path: str, body: Dict[str, Any], timeout: float) -> httpx.Response:
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+        content = dumps(body)
+        url = f"{self.base_url.rstrip('/')}{path}"
+        if self.http_pool is not None:
+            return await self.http_pool.get(url).post(url, headers=headers, content=content, timeout=timeout)
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            return await client.post(url, headers=headers, content=content)
+
+    def _backoff(self, attempt: int, server_hint: Optional[float]) -> float:
+        delay = random.uniform(0, min(self.backoff_max_s, self.backoff_base_s * (2 ** attempt)))
+        return max(delay, server_hint or 0.0)
+
+    async def embed(self, body: Dict[str, Any], estimated_tokens: int) -> Dict[str, Any]:
+        deadline = time.monotonic() + self.deadline_s
+        attempt = 0
+        while True:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire(estimated_tokens, deadline)
+            remaining = deadline - time.monotonic()
+            status: Optional[int] = None
+            hint: Optional[float] = None
+            try:
+                response = await self._post("/embeddings", body, timeout=max(remaining, 0.001))
+                if self.rate_limiter is not None:
+                    self.rate_limiter.observe(response.headers)
+                if response.status_code < 400:
+                    return loads(response.content)
+                status = response.status_code
+                hint = retry_after(response.headers)
+                if status not in RETRYABLE_STATUSES:
+                    RECALL_UPSTREAM_ERRORS.inc(self.realm_id, "openai_embeddings", "error")
+                    response.raise_for_status()
+                error = f"HTTP {status}"
+            except httpx.TransportError as exc:
+                error = f"{type(exc).__name__}: {exc}"
+            if status == 429:
+                self.throttled += 1
+            RECALL_UPSTREAM_ERRORS.inc(self.realm_id, "openai_embeddings", "rate_limited" if status == 429 else "error")
+            delay = self._backoff(attempt, hint)
+            if attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                raise EmbeddingUpstreamError(
+                    f"Embeddings failed after {attempt + 1} attempt(s): {error}", status, hint or delay
+                )
+            attempt += 1
+            self.retries += 1
+            print(f"[openai] embeddings {error} for realm {self.realm_id}; retry {attempt} in {delay * 1000:.0f} ms")
+            await asyncio.sleep(delay)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_retries": self.max_retries,
+            "deadline_ms": self.deadline_s * 1000.0,
+            "retries": self.retries,
+            "throttled": self.throttled,
+        }
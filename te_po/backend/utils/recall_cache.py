@@ -0,0 +1,70 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .embedding_cache import normalise_query
+
+ResultKey = Tuple[str, str, int, str, str]
+
+
+class CachedRecall:
+    __slots__ = ("response", "ingest_version", "stored_at")
+
+    def __init__(self, response: Dict[str, Any], ingest_version: Optional[int], stored_at: float) -> None:
+        self.response = response
+        self.ingest_version = ingest_version
+        self.stored_at = stored_at
+
+    def age(self) -> float:
+        return time.monotonic() - self.stored_at
+
+
+class RecallResultCache:
+    """Bounded LRU of full recall responses, tagged with the realm ingest version."""
+
+    def __init__(self, max_entries: Optional[int] = None) -> None:
+        if max_entries is None:
+            max_entries = int(os.getenv("RECALL_RESULT_CACHE_SIZE", "2048"))
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[ResultKey, CachedRecall]" = OrderedDict()
+        self.hits = 0
+        self.stale_hits = 0
+        self.stale_on_error = 0
+        self.misses = 0
+        self.evictions = 0
+        self.refreshes = 0
+
+    @staticmethod
+    def key(realm_id: str, query: str, top_k: int, vector_store: str, filters: str = "") -> ResultKey:
+        return (realm_id, normalise_query(query), top_k, vector_store, filters)
+
+    def get(self, key: ResultKey) -> Optional[CachedRecall]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: ResultKey, response: Dict[str, Any], ingest_version: Optional[int]) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = CachedRecall(response, ingest_version, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        served = self.hits + self.stale_hits + self.stale_on_error
+        lookups = served + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "stale_on_error": self.stale_on_error,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "refreshes": self.refreshes,
+            "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,82 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from .vector_codec import dumps
+
+FILTER_KEYS = ("source_ids", "metadata", "created_after", "created_before")
+
+
+def utc_naive(value: Any) -> datetime:
+    """``created_at`` columns are ``TIMESTAMP`` written by ``now()`` in UTC; compare naive UTC."""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if not isinstance(value, datetime):
+        raise ValueError(f"Expected an ISO timestamp, got {value!r}")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def normalise_filters(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Canonical filters, or ``None`` when nothing would be filtered."""
+    if not filters:
+        return None
+    unknown = set(filters) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown recall filters: {sorted(unknown)}")
+    normalised: Dict[str, Any] = {}
+    if filters.get("source_ids"):
+        normalised["source_ids"] = sorted({str(source_id) for source_id in filters["source_ids"]})
+    if filters.get("metadata"):
+        if not isinstance(filters["metadata"], dict):
+            raise ValueError("filters.metadata must be an object of key/value matches")
+        normalised["metadata"] = filters["metadata"]
+    for bound in ("created_after", "created_before"):
+        if filters.get(bound) is not None:
+            normalised[bound] = utc_naive(filters[bound])
+    return normalised or None
+
+
+def filters_key(filters: Optional[Dict[str, Any]]) -> str:
+    """Stable string for cache and single-flight keys ("" when unfiltered)."""
+    if not filters:
+        return ""
+    canonical = {key: value.isoformat() if isinstance(value, datetime) else value for key, value in filters.items()}
+    return dumps(_sorted(canonical)).decode("utf-8")
+
+
+def _sorted(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _sorted(value[key]) for key in sorted(value)}
+    if isinstance(value, list):
+        return [_sorted(item) for item in value]
+    return value
+
+
+def function_params(filters: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Named arguments for the match function (migration 009); empty when unfiltered."""
+    if not filters:
+        return {}
+    params: Dict[str, Any] = {}
+    if "source_ids" in filters:
+        params["filter_source_ids"] = filters["source_ids"]
+    if "metadata" in filters:
+        params["filter_metadata"] = filters["metadata"]
+    for bound in ("created_after", "created_before"):
+        if bound in filters:
+            params[bound] = filters[bound]
+    return params
+
+
+def json_contains(document: Any, pattern: Any) -> bool:
+    """Python twin of JSONB ``document @> pattern`` for objects, arrays and scalars."""
+    if isinstance(pattern, dict):
+        return isinstance(document, dict) and all(
+            key in document and json_contains(document[key], value) for key, value in pattern.items()
+        )
+    if isinstance(pattern, list):
+        if not isinstance(document, list):
+            return False
+        return all(any(json_contains(item, wanted) for item in document) for wanted in pattern)
+    return document == pattern
+
@@ -0,0 +1,134 @@
+import asyncio
+import os
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from ..db.supabase import AsyncSupabaseClient
+
+OVERFLOW_POLICIES = {"drop_newest", "drop_oldest"}
+LOG_DETAIL_LEVELS = {"full", "ids", "counts"}
+
+LogRow = Tuple[AsyncSupabaseClient, str, str, Dict[str, Any]]
+
+
+def compact_log_response(matches: List[Dict[str, Any]], detail: str) -> Optional[List[Dict[str, Any]]]:
+    """Shape the ``recall_logs.response`` JSONB for a log detail level (``full``, ``ids`` or ``counts``)."""
+    if detail == "full":
+        return matches
+    if detail == "ids":
+        return [
+            {
+                "chunk_id": match.get("chunk_id") or match.get("id"),
+                "source_id": match.get("source_id"),
+                "score": match.get("score", match.get("similarity")),
+            }
+            for match in matches
+        ]
+    return None
+
+
+class RecallLogWriter:
+    """Bounded in-process queue that writes ``recall_logs`` rows in bulk, off the request path."""
+
+    def __init__(
+        self,
+        max_queue: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        flush_interval_ms: Optional[float] = None,
+        overflow: Optional[str] = None,
+    ) -> None:
+        self.max_queue = max_queue or int(os.getenv("RECALL_LOG_QUEUE_SIZE", "10000"))
+        self.batch_size = batch_size or int(os.getenv("RECALL_LOG_BATCH_SIZE", "200"))
+        self.flush_interval_s = (flush_interval_ms or float(os.getenv("RECALL_LOG_FLUSH_INTERVAL_MS", "1000"))) / 1000.0
+        self.overflow = overflow or os.getenv("RECALL_LOG_OVERFLOW", "drop_oldest")
+        if self.overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"RECALL_LOG_OVERFLOW must be one of {sorted(OVERFLOW_POLICIES)}")
+        self._rows: Deque[LogRow] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.queued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.failed = 0
+        self.batches = 0
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        # Let the loop finish its current write rather than cancelling mid-batch.
+        if self._task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    def enqueue(self, client: AsyncSupabaseClient, table: str, realm_id: str, row: Dict[str, Any]) -> bool:
+        if len(self._rows) >= self.max_queue:
+            self.dropped += 1
+            if self.overflow == "drop_newest":
+                return False
+            self._rows.popleft()
+        self._rows.append((client, table, realm_id, row))
+        self.queued += 1
+        if self._wakeup is not None and len(self._rows) >= self.batch_size:
+            self._wakeup.set()
+        return True
+
+    def enqueue_many(self, client: AsyncSupabaseClient, table: str, realm_id: str, rows: List[Dict[str, Any]]) -> int:
+        """Queue a group of rows and wake the flusher so they go out together."""
+        accepted = sum(1 for row in rows if self.enqueue(client, table, realm_id, row))
+        if self._wakeup is not None and accepted:
+            self._wakeup.set()
+        return accepted
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval_s)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        while self._rows:
+            batch = [self._rows.popleft() for _ in range(min(self.batch_size, len(self._rows)))]
+            await self._write(batch)
+
+    async def _write(self, batch: List[LogRow]) -> None:
+        groups: Dict[Tuple[int, str, str], List[Dict[str, Any]]] = {}
+        clients: Dict[int, AsyncSupabaseClient] = {}
+        for client, table, realm_id, row in batch:
+            clients[id(client)] = client
+            groups.setdefault((id(client), table, realm_id), []).append(row)
+        for (client_id, table, realm_id), rows in groups.items():
+            self.batches += 1
+            try:
+                ok = await clients[client_id].insert_many_with_realm(table, rows, realm_id)
+            except Exception as exc:
+                print(f"[recall_log_writer] flush to {table} failed: {exc}")
+                ok = False
+            if ok:
+                self.flushed += len(rows)
+            else:
+                self.failed += len(rows)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._rows),
+            "max_queue": self.max_queue,
+            "batch_size": self.batch_size,
+            "flush_interval_ms": self.flush_interval_s * 1000.0,
+            "overflow": self.overflow,
+            "queued": self.queued,
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "failed": self.failed,
+            "batches": self.batches,
+        }
@@ -0,0 +1,68 @@
+import heapq
+from typing import Any, Dict, List, Optional
+
+MERGE_METHODS = {"rrf", "weighted"}
+DEDUP_KEYS = {"chunk_id", "source_id"}
+DEFAULT_RRF_K = 60
+
+
+def raw_score(match: Dict[str, Any]) -> float:
+    """Backend-native score: pgvector and the local index return ``similarity``, others ``score``."""
+    value = match.get("similarity", match.get("score"))
+    return float(value) if value is not None else 0.0
+
+
+def dedup_key(match: Dict[str, Any], dedup_by: str) -> Any:
+    if dedup_by == "source_id" and match.get("source_id") is not None:
+        return ("source", match["source_id"])
+    chunk_id = match.get("chunk_id") or match.get("id")
+    if chunk_id is not None:
+        return ("chunk", chunk_id)
+    # No id at all: never collapse it with anything else.
+    return ("object", id(match))
+
+
+def _min_max(matches: List[Dict[str, Any]]) -> List[float]:
+    scores = [raw_score(match) for match in matches]
+    if not scores:
+        return []
+    low, high = min(scores), max(scores)
+    if high == low:
+        return [1.0] * len(scores)
+    return [(score - low) / (high - low) for score in scores]
+
+
+def fuse_matches(
+    ranked: Dict[str, List[Dict[str, Any]]],
+    top_k: int,
+    method: str = "rrf",
+    weights: Optional[Dict[str, float]] = None,
+    rrf_k: int = DEFAULT_RRF_K,
+    dedup_by: str = "chunk_id",
+) -> List[Dict[str, Any]]:
+    """Fuse per-backend rankings (``rrf`` or min-max ``weighted``) into one deduplicated top-k list."""
+    if method not in MERGE_METHODS:
+        raise ValueError(f"merge method must be one of {sorted(MERGE_METHODS)}")
+    if dedup_by not in DEDUP_KEYS:
+        raise ValueError(f"dedup_by must be one of {sorted(DEDUP_KEYS)}")
+    weights = weights or {}
+    fused: Dict[Any, List[Any]] = {}
+    for backend, matches in ranked.items():
+        weight = float(weights.get(backend, 1.0))
+        if method == "rrf":
+            contributions = [weight / (rrf_k + rank) for rank in range(1, len(matches) + 1)]
+        else:
+            contributions = [weight * score for score in _min_max(matches)]
+        for match, contribution in zip(matches, contributions):
+            key = dedup_key(match, dedup_by)
+            entry = fused.get(key)
+            if entry is None:
+                fused[key] = [contribution, match, [backend]]
+                continue
+            entry[0] += contribution
+            if backend not in entry[2]:
+                entry[2].append(backend)
+            if raw_score(match) > raw_score(entry[1]):
+                entry[1] = match
+    best = heapq.nlargest(top_k, fused.values(), key=lambda entry: (entry[0], raw_score(entry[1])))
+    return [{**match, "score": round(score, 6), "backends": backends} for score, match, backends in best]
@@ -0,0 +1,129 @@
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..db.postgres import PostgresPools
+from ..schema.realms import RealmConfig, RealmConfigLoader
+from .embedding_cache import EmbeddingCache
+from .http_pool import HttpClientPool, PoolSettings
+from .openai_embeddings import EmbeddingRateLimits
+from .recall_cache import RecallResultCache
+from .recall_log_writer import RecallLogWriter
+from .recall_service import RecallService
+from .rpc_guard import BREAKER_STATES, RpcGuards
+
+
+class RecallServiceRegistry:
+    """Process-wide cache of per-realm ``RecallService`` instances and their shared clients."""
+
+    def __init__(
+        self,
+        pool_settings: Optional[PoolSettings] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        log_writer: Optional[RecallLogWriter] = None,
+        result_cache: Optional[RecallResultCache] = None,
+        rate_limits: Optional[EmbeddingRateLimits] = None,
+        rpc_guards: Optional[RpcGuards] = None,
+        pg_pools: Optional[PostgresPools] = None,
+    ) -> None:
+        self.http_pool = HttpClientPool(pool_settings)
+        self.embedding_cache = embedding_cache or EmbeddingCache()
+        self.log_writer = log_writer or RecallLogWriter()
+        self.result_cache = result_cache or RecallResultCache()
+        self.rate_limits = rate_limits or EmbeddingRateLimits()
+        self.rpc_guards = rpc_guards or RpcGuards()
+        self.pg_pools = pg_pools or PostgresPools()
+        self._services: Dict[str, RecallService] = {}
+
+    def get(self, config: RealmConfig) -> RecallService:
+        service = self._services.get(config.realm_id)
+        if service is None:
+            service = RecallService(
+                config,
+                http_pool=self.http_pool,
+                embedding_cache=self.embedding_cache,
+                log_writer=self.log_writer,
+                result_cache=self.result_cache,
+                rate_limits=self.rate_limits,
+                rpc_guards=self.rpc_guards,
+                pg_pools=self.pg_pools,
+            )
+            self._services[config.realm_id] = service
+            # Every realm is checked on first use, not only those preloaded.
+            service.start_dimension_check()
+        return service
+
+    def start(self) -> None:
+        self.log_writer.start()
+
+    async def preload(self, realm_ids: Optional[List[str]] = None) -> None:
+        """Create services for ``RECALL_PRELOAD_REALMS``; a dimension mismatch fails startup."""
+        if realm_ids is None:
+            realm_ids = [realm_id.strip() for realm_id in os.getenv("RECALL_PRELOAD_REALMS", "").split(",") if realm_id.strip()]
+        for realm_id in realm_ids:
+            config = RealmConfigLoader.load(realm_id)
+            if not config.features.get("recall"):
+                continue
+            await self.get(config).ensure_dimensions()
+
+    async def aclose(self) -> None:
+        # Drain queued recall_logs rows while the pooled clients are still open.
+        for service in self._services.values():
+            await service.aclose()
+        await self.log_writer.stop()
+        self._services.clear()
+        await self.http_pool.aclose()
+        await self.pg_pools.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "realms": sorted(self._services),
+            "embedding": {realm_id: service.embedding_settings() for realm_id, service in self._services.items()},
+            "pools": self.http_pool.stats(),
+            "embedding_cache": self.embedding_cache.stats(),
+            "recall_log_writer": self.log_writer.stats(),
+            "result_cache": self.result_cache.stats(),
+            "openai_rate_limits": self.rate_limits.stats(),
+            "embedding_providers": {realm_id: service.embedding_provider.stats() for realm_id, service in self._services.items()},
+            "supabase_rpc": self.rpc_guards.stats(),
+            "postgres_pools": self.pg_pools.stats(),
+            "admission": {realm_id: service.admission.stats() for realm_id, service in self._services.items()},
+            "single_flight": {realm_id: service.single_flight_stats() for realm_id, service in self._services.items()},
+            "embedding_batchers": {
+                realm_id: service.embedding_batcher.stats()
+                for realm_id, service in self._services.items()
+                if service.embedding_batcher is not None
+            },
+        }
+
+    def metric_samples(self) -> Iterator[Tuple[str, str, str, Dict[str, str], float]]:
+        """Scrape-time samples for ``/metrics`` built from the subsystem counters."""
+        for name, stats in (("embedding", self.embedding_cache.stats()), ("result", self.result_cache.stats())):
+            labels = {"cache": name}
+            yield "recall_cache_hits_total", "counter", "Recall cache hits (including stale serves).", labels, stats["hits"] + stats.get("stale_hits", 0) + stats.get("stale_on_error", 0)
+            yield "recall_cache_misses_total", "counter", "Recall cache misses.", labels, stats["misses"]
+            yield "recall_cache_hit_ratio", "gauge", "Recall cache hit ratio since start.", labels, stats["hit_ratio"]
+            yield "recall_cache_entries", "gauge", "Entries currently held by each recall cache.", labels, stats["entries"]
+        writer = self.log_writer.stats()
+        for key in ("queued", "flushed", "dropped", "failed"):
+            yield f"recall_log_rows_{key}_total", "counter", f"recall_logs rows {key} by the background writer.", {}, writer[key]
+        yield "recall_log_queue_depth", "gauge", "recall_logs rows waiting to be flushed.", {}, writer["pending"]
+        for realm_id, service in self._services.items():
+            admission = service.admission.stats()
+            labels = {"realm": realm_id}
+            yield "recall_admission_active", "gauge", "Recall requests holding an admission slot.", labels, admission["active"]
+            yield "recall_admission_queue_depth", "gauge", "Recall requests waiting for an admission slot.", labels, admission["queue_depth"]
+            for reason in ("queue_full", "timeout"):
+                yield "recall_admission_rejected_total", "counter", "Recall requests rejected with 429 by reason.", {**labels, "reason": reason}, admission[f"rejected_{reason}"]
+        for project, guard in self.rpc_guards.stats().items():
+            labels = {"project": project}
+            yield "recall_supabase_breaker_state", "gauge", "Supabase RPC circuit breaker state (0 closed, 1 half-open, 2 open).", labels, BREAKER_STATES[guard["state"]]
+            yield "recall_supabase_breaker_opens_total", "counter", "Times the Supabase RPC breaker opened.", labels, guard["opens"]
+            yield "recall_supabase_breaker_rejections_total", "counter", "Supabase RPC calls refused while the breaker was open.", labels, guard["rejections"]
+            yield "recall_supabase_hedges_total", "counter", "Hedged duplicate Supabase RPC calls fired.", labels, guard["hedges"]
+            yield "recall_supabase_hedge_wins_total", "counter", "Hedged Supabase RPC calls that answered first.", labels, guard["hedge_wins"]
+        for origin, counts in self.http_pool.stats()["clients"].items():
+            yield "recall_http_requests_total", "counter", "Requests sent through the pooled upstream clients.", {"origin": origin}, counts["requests"]
+            yield "recall_http_responses_total", "counter", "Responses received by the pooled upstream clients.", {"origin": origin}, counts["responses"]
+        for database, pool in self.pg_pools.stats().items():
+            yield "recall_pg_pool_connections", "gauge", "Pooled asyncpg connections by state.", {"database": database, "state": "idle"}, pool["idle"]
+            yield "recall_pg_pool_connections", "gauge", "Pooled asyncpg connections by state.", {"database": database, "state": "in_use"}, pool["size"] - pool["idle"]
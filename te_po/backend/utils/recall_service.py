@@ -1,83 +1,913 @@
+import asyncio
 import os
+import random
 import time
-from typing import Any, Dict, List
+from array import array
+from functools import partial
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
 
-import httpx
+from ..db.postgres import PostgresPools, PostgresVectorClient, encode_vector
+from ..db.supabase import AsyncSupabaseClient
+from .admission import AdmissionController
+from .embedding_batcher import EmbeddingBatcher
+from .embedding_cache import EmbeddingCache, normalise_query
+from .embedding_providers import create_embedding_provider
+from .http_pool import HttpClientPool
+from .metrics import RECALL_COALESCED, RECALL_IN_FLIGHT, RECALL_REQUESTS, RECALL_STAGE_SECONDS, RECALL_UPSTREAM_ERRORS
+from .openai_embeddings import EmbeddingRateLimits
+from .recall_cache import CachedRecall, RecallResultCache
+from .recall_filters import filters_key, function_params, normalise_filters
+from .recall_log_writer import LOG_DETAIL_LEVELS, RecallLogWriter, compact_log_response
+from .recall_merge import DEDUP_KEYS, DEFAULT_RRF_K, MERGE_METHODS, fuse_matches
+from .rpc_guard import CircuitOpen, RpcGuards
+from .vector_codec import pgvector_literal, truncate_embedding
 
-from ..db.supabase import SupabaseClient
+DEFAULT_BACKEND_TIMEOUT_MS = 10000
+# Matches research_embeddings.embedding VECTOR(1536) in migrations/001_realm_tables.sql.
+DEFAULT_EMBEDDING_DIMENSIONS = 1536
+EMBEDDING_TRUNCATION_MODES = {"api", "local"}
+SUPABASE_TRANSPORTS = {"postgrest", "asyncpg"}
+EMBEDDING_STORAGES = {"full", "halfvec", "binary"}
+# How long an inconclusive dimension check (database or provider unreachable) is reused before retrying.
+DIMENSION_RECHECK_S = 30.0
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 2)
+
+
+class RecallBackendsUnavailable(RuntimeError):
+    """Raised when every selected vector store failed or missed its deadline."""
+
+    def __init__(self, backends: Dict[str, Dict[str, Any]]):
+        self.backends = backends
+        summary = ", ".join(f"{name}={info['status']}" for name, info in backends.items())
+        super().__init__(f"All recall backends failed ({summary})")
+
+
+class BackendDisabled(RuntimeError):
+    """Raised by a vector store that is not configured; it is reported as ``disabled``, not failed."""
+
+
+def _backend_outcome(backends: Dict[str, Dict[str, Any]]) -> Tuple[bool, bool]:
+    """``(partial, all_failed)`` over the stores that actually ran (``disabled`` ones are ignored)."""
+    active = [status["status"] for status in backends.values() if status["status"] != "disabled"]
+    failed = [status for status in active if status != "ok"]
+    return bool(failed), bool(active) and len(failed) == len(active)
+
+
+class EmbeddingDimensionMismatch(RuntimeError):
+    """Raised when a realm's embedding dimensions differ from its pgvector column."""
 
 
 class RecallService:
-    def __init__(self, config):
+    def __init__(
+        self,
+        config,
+        http_pool: Optional[HttpClientPool] = None,
+        embedding_cache: Optional[EmbeddingCache] = None,
+        log_writer: Optional[RecallLogWriter] = None,
+        result_cache: Optional[RecallResultCache] = None,
+        rate_limits: Optional[EmbeddingRateLimits] = None,
+        rpc_guards: Optional[RpcGuards] = None,
+        pg_pools: Optional[PostgresPools] = None,
+    ):
         self.config = config
-        self.openai_key = os.getenv("OPENAI_API_KEY")
-        self.embedding_model = "text-embedding-3-large"
+        recall_cfg = config.recall_config
+        dimensions = recall_cfg.get("embedding_dimensions")
+        if dimensions is None and recall_cfg.get("embedding_provider", "openai") == "openai":
+            dimensions = DEFAULT_EMBEDDING_DIMENSIONS
+        # None keeps whatever size the provider's model produces natively.
+        self.embedding_dimensions: Optional[int] = int(dimensions) if dimensions else None
+        self.embedding_truncation = recall_cfg.get("embedding_truncation", "api")
+        if self.embedding_truncation not in EMBEDDING_TRUNCATION_MODES:
+            raise ValueError(f"recall_config.embedding_truncation must be one of {sorted(EMBEDDING_TRUNCATION_MODES)}")
+        self.column_dimensions: Optional[int] = None
+        self._dimension_check: Optional[asyncio.Task] = None
+        self._dimension_check_started = float("-inf")
+        self._dimensions_checked = False
+        self.embedding_provider = create_embedding_provider(
+            config, self.embedding_dimensions, http_pool=http_pool, rate_limits=rate_limits
+        )
+        self.embedding_model = self.embedding_provider.model
+        self.http_pool = http_pool
+        self.embedding_cache = embedding_cache
+        self.log_writer = log_writer
+        self.result_cache = result_cache
+        self._ingest_version: Optional[int] = None
+        self._ingest_version_checked_at = float("-inf")
+        self._ingest_version_refresh: Optional[asyncio.Task] = None
+        self._refreshing: Dict[Any, asyncio.Task] = {}
+        self._in_flight: Dict[Tuple[str, str, int, str, str], Tuple[asyncio.Task, Dict[str, float]]] = {}
+        self.flights = 0
+        self.coalesced = 0
+        window_ms = float(recall_cfg.get("embed_batch_window_ms", os.getenv("RECALL_EMBED_BATCH_WINDOW_MS", "5")))
+        self.embedding_batcher: Optional[EmbeddingBatcher] = None
+        if window_ms > 0:
+            self.embedding_batcher = EmbeddingBatcher(
+                self._embed_many,
+                window_ms=window_ms,
+                max_batch=int(recall_cfg.get("embed_batch_max_inputs", os.getenv("RECALL_EMBED_BATCH_MAX_INPUTS", "64"))),
+                max_tokens=int(recall_cfg.get("embed_batch_max_tokens", os.getenv("RECALL_EMBED_BATCH_MAX_TOKENS", "8000"))),
+            )
+        self.admission = AdmissionController.from_config(config.realm_id, recall_cfg)
+        self._local_index = None
+        self._local_index_lock = asyncio.Lock()
         supabase_cfg = config.supabase
-        self.supabase_client = SupabaseClient(
+        self.supabase_client = AsyncSupabaseClient(
             project_url=supabase_cfg.project_url,
             service_role_key=os.getenv("SUPABASE_SERVICE_ROLE_KEY"),
             anon_key=supabase_cfg.anon_key,
+            http_client=http_pool.get(supabase_cfg.project_url) if http_pool and supabase_cfg.project_url else None,
         )
+        transport = recall_cfg.get("supabase_transport", "postgrest")
+        if transport not in SUPABASE_TRANSPORTS:
+            raise ValueError(f"recall_config.supabase_transport must be one of {sorted(SUPABASE_TRANSPORTS)}")
+        # "asyncpg" talks to Postgres directly for the pgvector search; PostgREST is still used for logs.
+        self.pg_client: Optional[PostgresVectorClient] = None
+        if transport == "asyncpg":
+            self.pg_client = PostgresVectorClient.from_config(
+                config.realm_id, recall_cfg.get("postgres") or {}, pg_pools or PostgresPools()
+            )
+        storage = (recall_cfg.get("supabase_rpc") or {}).get("storage", "full")
+        if storage not in EMBEDDING_STORAGES:
+            raise ValueError(f"recall_config.supabase_rpc.storage must be one of {sorted(EMBEDDING_STORAGES)}")
+        guard_key = self.pg_client.name if self.pg_client is not None else self.supabase_client.project_url
+        self.rpc_guard = rpc_guards.get(guard_key) if rpc_guards else None
 
     async def _embed(self, text: str) -> Dict[str, Any]:
-        if not self.openai_key:
-            raise RuntimeError("OpenAI key missing for recall service")
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post(
-                "https://api.openai.com/v1/embeddings",
-                headers={
-                    "Authorization": f"Bearer {self.openai_key}",
-                    "Content-Type": "application/json",
-                },
-                json={"model": self.embedding_model, "input": text},
+        cache_key = None
+        if self.embedding_cache is not None:
+            cache_key = self.embedding_cache.key(self.embedding_model, self.embedding_dimensions, text)
+            cached = self.embedding_cache.get(cache_key)
+            if cached is not None:
+                return cached
+        if self.embedding_batcher is not None:
+            embedded = await self.embedding_batcher.submit(text)
+        else:
+            embedded = (await self._embed_many([text]))[0]
+        if cache_key is not None:
+            self.embedding_cache.put(cache_key, embedded["embedding"], embedded["prompt_tokens"])
+        return embedded
+
+    async def _embed_many(self, texts: List[str]) -> List[Dict[str, Any]]:
+        embedded = await self.embedding_provider.embed_many(texts)
+        return [{**item, "embedding": self._fit_dimensions(item["embedding"])} for item in embedded]
+
+    def _fit_dimensions(self, vector: array) -> array:
+        if self.embedding_dimensions and len(vector) != self.embedding_dimensions:
+            return truncate_embedding(vector, self.embedding_dimensions)
+        return vector
+
+    async def output_dimensions(self) -> int:
+        """Length of the query vectors: configured, else declared by the provider, else probed."""
+        if self.embedding_dimensions:
+            return self.embedding_dimensions
+        if self.embedding_provider.dimensions:
+            return self.embedding_provider.dimensions
+        probe = await self._embed_many(["dimension probe"])
+        return len(probe[0]["embedding"])
+
+    async def check_embedding_dimensions(self) -> Optional[int]:
+        """Raise ``EmbeddingDimensionMismatch`` if query vectors do not fit the pgvector column (migration 006)."""
+        try:
+            if self.pg_client is not None:
+                self.column_dimensions = await self.pg_client.fetchval("SELECT research_embedding_dimensions()")
+            else:
+                self.column_dimensions = await self.supabase_client.rpc("research_embedding_dimensions", raise_errors=True)
+        except Exception as exc:
+            print(f"[recall] could not read pgvector dimensions for realm {self.config.realm_id}: {exc}")
+            return None
+        if not self.column_dimensions:
+            # An unconstrained column accepts any length.
+            self._dimensions_checked = True
+            return None
+        try:
+            dimensions = await self.output_dimensions()
+        except Exception as exc:
+            print(f"[recall] could not probe embedding dimensions for realm {self.config.realm_id}: {exc}")
+            return self.column_dimensions
+        self._dimensions_checked = True
+        if dimensions != self.column_dimensions:
+            raise EmbeddingDimensionMismatch(
+                f"Realm {self.config.realm_id} embeds {self.embedding_model} at {dimensions} dims "
+                f"but research_embeddings.embedding is vector({self.column_dimensions}); "
+                "set recall_config.embedding_dimensions (or the model) to match"
             )
-        response.raise_for_status()
-        payload = response.json()
+        return self.column_dimensions
+
+    def start_dimension_check(self) -> None:
+        """Run ``check_embedding_dimensions`` in the background until it is conclusive; queries wait for it."""
+        retry = (
+            self._dimension_check is not None
+            and self._dimension_check.done()
+            and not self._dimensions_checked
+            and time.monotonic() - self._dimension_check_started >= DIMENSION_RECHECK_S
+        )
+        if self._dimension_check is None or retry:
+            self._dimension_check_started = time.monotonic()
+            self._dimension_check = asyncio.get_running_loop().create_task(self.check_embedding_dimensions())
+            # Retrieved here too, so a realm that never serves a query does not log an unretrieved error.
+            self._dimension_check.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    async def ensure_dimensions(self) -> None:
+        self.start_dimension_check()
+        await asyncio.shield(self._dimension_check)
+
+    def embedding_settings(self) -> Dict[str, Any]:
         return {
-            "embedding": payload["data"][0]["embedding"],
-            "prompt_tokens": payload.get("usage", {}).get("prompt_tokens", len(text.split())),
+            "provider": self.embedding_provider.name,
+            "model": self.embedding_model,
+            "dimensions": self.embedding_dimensions,
+            "truncation": self.embedding_truncation,
+            "column_dimensions": self.column_dimensions,
+            "supabase_transport": "asyncpg" if self.pg_client is not None else "postgrest",
         }
 
-    async def search_openai(self, embedding: List[float], top_k: int) -> List[Dict[str, Any]]:
+    async def search_openai(
+        self, embedding: Sequence[float], top_k: int, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
         # Placeholder: OpenAI vector search is disabled until vector_store_id/API access is configured.
-        return []
+        raise BackendDisabled("OpenAI vector search is not configured")
 
-    async def search_supabase(self, embedding: List[float], top_k: int) -> List[Dict[str, Any]]:
-        return self.supabase_client.rpc_match_embeddings(
-            embedding=embedding,
-            match_count=top_k,
-            filter_realm_id=self.config.realm_id,
+    async def search_supabase(
+        self, embedding: Sequence[float], top_k: int, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        rpc_cfg = self.config.recall_config.get("supabase_rpc") or {}
+        function_name = rpc_cfg.get("function", "match_research_embeddings")
+        # Only sent when set: the 003 function rejects unknown arguments, so any of them
+        # routes to v2 (filters need 009 and compact storage needs 010).
+        search_params = {key: rpc_cfg[key] for key in ("ef_search", "probes") if rpc_cfg.get(key) is not None}
+        if rpc_cfg.get("storage", "full") != "full":
+            search_params["storage"] = rpc_cfg["storage"]
+            if rpc_cfg.get("rescore_factor") is not None:
+                search_params["rescore_factor"] = rpc_cfg["rescore_factor"]
+        search_params.update(function_params(filters))
+        if search_params and function_name == "match_research_embeddings":
+            function_name = "match_research_embeddings_v2"
+        # Encode the vector once so a hedged duplicate reuses it.
+        if self.pg_client is not None:
+            call = partial(
+                self.pg_client.match_embeddings,
+                embedding=encode_vector(embedding),
+                match_count=top_k,
+                filter_realm_id=self.config.realm_id,
+                function_name=function_name,
+                search_params=search_params,
+                timeout=self._backend_timeout("supabase"),
+            )
+        else:
+            call = partial(
+                self.supabase_client.rpc_match_embeddings,
+                embedding=pgvector_literal(embedding),
+                match_count=top_k,
+                filter_realm_id=self.config.realm_id,
+                function_name=function_name,
+                raise_errors=True,
+                timeout=self._backend_timeout("supabase"),
+                search_params=search_params,
+            )
+        if self.rpc_guard is None:
+            return await call()
+        return await self.rpc_guard.call(call, rpc_cfg)
+
+    async def _get_local_index(self):
+        async with self._local_index_lock:
+            if self._local_index is None:
+                # Imported lazily so realms without a local snapshot never need numpy.
+                from .local_vector_index import LocalVectorIndex
+
+                recall_cfg = self.config.recall_config
+                path = recall_cfg.get("local_index_path")
+                if not path:
+                    raise RuntimeError(f"recall_config.local_index_path not set for realm {self.config.realm_id}")
+                self._local_index = await asyncio.to_thread(
+                    LocalVectorIndex.load,
+                    path,
+                    mode=recall_cfg.get("local_index_mode", "exact"),
+                    nprobe=int(recall_cfg.get("local_ivf_nprobe", 8)),
+                )
+        return self._local_index
+
+    async def search_local(
+        self, embedding: Sequence[float], top_k: int, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        index = await self._get_local_index()
+        # NumPy releases the GIL during the matrix product, so a worker thread keeps the loop free.
+        return await asyncio.to_thread(index.search, embedding, top_k, filters)
+
+    def _backend_timeout(self, name: str) -> float:
+        recall_cfg = self.config.recall_config
+        timeouts = recall_cfg.get("backend_timeouts_ms") or {}
+        default_ms = recall_cfg.get("backend_timeout_ms", DEFAULT_BACKEND_TIMEOUT_MS)
+        return float(timeouts.get(name, default_ms)) / 1000.0
+
+    def _selected_backends(self, vector_store_setting: str) -> List[str]:
+        backends = []
+        if vector_store_setting in {"openai", "both"}:
+            backends.append("openai")
+        if vector_store_setting == "local":
+            return ["local"]
+        if vector_store_setting in {"supabase", "both"} or self.config.recall_config.get("use_supabase_pgvector"):
+            backends.append("supabase")
+        fallback = (self.config.recall_config.get("supabase_rpc") or {}).get("fallback")
+        if "supabase" in backends and fallback and fallback not in backends and self._supabase_circuit_open():
+            # Supabase still reports circuit_open in `backends`; the fallback store fills in.
+            backends.append(fallback)
+        return backends
+
+    def _supabase_circuit_open(self) -> bool:
+        return self.rpc_guard is not None and self.rpc_guard.breaker.is_open()
+
+    def _supabase_refused(self, vector_store_setting: str) -> bool:
+        """Whether this query needs Supabase while its breaker is refusing calls."""
+        return self._supabase_circuit_open() and "supabase" in self._selected_backends(vector_store_setting)
+
+    async def _search_backend(
+        self,
+        name: str,
+        embedding: Sequence[float],
+        top_k: int,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        search = {"openai": self.search_openai, "supabase": self.search_supabase, "local": self.search_local}[name]
+        timeout = self._backend_timeout(name)
+        started = time.perf_counter()
+        status: Dict[str, Any] = {"status": "ok"}
+        matches: List[Dict[str, Any]] = []
+        try:
+            matches = await asyncio.wait_for(search(embedding, top_k, filters), timeout=timeout)
+        except asyncio.TimeoutError:
+            status = {"status": "timeout", "timeout_ms": int(timeout * 1000)}
+        except CircuitOpen as exc:
+            status = {"status": "circuit_open", "retry_in_ms": int(exc.retry_in_s * 1000)}
+        except BackendDisabled:
+            status = {"status": "disabled"}
+        except Exception as exc:
+            print(f"[recall] {name} search failed for realm {self.config.realm_id}: {exc}")
+            status = {"status": "error", "error": str(exc)}
+        elapsed = time.perf_counter() - started
+        RECALL_STAGE_SECONDS.observe(elapsed, self.config.realm_id, f"search_{name}")
+        if status["status"] not in ("ok", "disabled"):
+            RECALL_UPSTREAM_ERRORS.inc(self.config.realm_id, name, status["status"])
+        status["latency_ms"] = int(elapsed * 1000)
+        status["count"] = len(matches)
+        return {"name": name, "matches": matches, "status": status}
+
+    async def search_all(
+        self,
+        embedding: Sequence[float],
+        top_k: int,
+        vector_store_setting: str,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """Query the selected vector stores concurrently; failed stores mark the result ``partial``."""
+        names = self._selected_backends(vector_store_setting)
+        fetch_k = self.fetch_k(top_k)
+        results = await asyncio.gather(*(self._search_backend(name, embedding, fetch_k, filters) for name in names))
+        backends = {result["name"]: result["status"] for result in results}
+        partial, all_failed = _backend_outcome(backends)
+        if all_failed:
+            raise RecallBackendsUnavailable(backends)
+        return {
+            "ranked": {result["name"]: result["matches"] for result in results},
+            "backends": backends,
+            "partial": partial,
+        }
+
+    def _merge_settings(self) -> Dict[str, Any]:
+        settings = self.config.recall_config.get("merge") or {}
+        method = settings.get("method", "rrf")
+        if method not in MERGE_METHODS:
+            print(f"[recall] unknown merge method '{method}' for realm {self.config.realm_id}; using 'rrf'")
+            method = "rrf"
+        dedup_by = settings.get("dedup_by", "chunk_id")
+        if dedup_by not in DEDUP_KEYS:
+            raise ValueError(f"recall_config.merge.dedup_by must be one of {sorted(DEDUP_KEYS)}")
+        return {
+            "method": method,
+            "rrf_k": int(settings.get("rrf_k", DEFAULT_RRF_K)),
+            "weights": settings.get("weights") or {},
+            "dedup_by": dedup_by,
+            "overfetch": float(settings.get("overfetch", 2)),
+        }
+
+    def fetch_k(self, top_k: int) -> int:
+        """Candidates requested from each store for a final ``top_k`` (``merge.overfetch`` x top_k)."""
+        return max(top_k, int(top_k * self._merge_settings()["overfetch"] + 0.5))
+
+    def merge(self, ranked: Dict[str, List[Dict[str, Any]]], top_k: int) -> List[Dict[str, Any]]:
+        settings = self._merge_settings()
+        return fuse_matches(
+            ranked,
+            top_k,
+            method=settings["method"],
+            weights=settings["weights"],
+            rrf_k=settings["rrf_k"],
+            dedup_by=settings["dedup_by"],
         )
 
-    async def log(self, query: str, matches: List[Dict[str, Any]], vector_store: str) -> None:
+    def _log_detail(self) -> str:
+        recall_cfg = self.config.recall_config
+        detail = recall_cfg.get("log_detail", "full")
+        if detail not in LOG_DETAIL_LEVELS:
+            print(f"[recall] unknown log_detail '{detail}' for realm {self.config.realm_id}; using 'full'")
+            return "full"
+        sample_rate = float(recall_cfg.get("log_full_sample_rate", 0.0))
+        if detail != "full" and sample_rate > 0 and random.random() < sample_rate:
+            return "full"
+        return detail
+
+    def _log_row(
+        self,
+        query: str,
+        matches: List[Dict[str, Any]],
+        vector_store: str,
+        latency_ms: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        detail = self._log_detail()
+        return {
+            "query": query,
+            "results_count": len(matches),
+            "vector_store": vector_store,
+            "response": compact_log_response(matches, detail),
+            "log_detail": detail,
+            "latency_ms": latency_ms,
+        }
+
+    async def log(
+        self,
+        query: str,
+        matches: List[Dict[str, Any]],
+        vector_store: str,
+        latency_ms: Optional[int] = None,
+    ) -> None:
         table = self.config.supabase.tables.recall_logs
-        self.supabase_client.insert_with_realm(
-            table=table,
-            payload={
-                "query": query,
-                "results_count": len(matches),
-                "vector_store": vector_store,
-                "response": matches,
-            },
-            realm_id=self.config.realm_id,
+        payload = self._log_row(query, matches, vector_store, latency_ms)
+        if self.log_writer is not None:
+            self.log_writer.enqueue(self.supabase_client, table, self.config.realm_id, payload)
+            return
+        await self.supabase_client.insert_with_realm(table=table, payload=payload, realm_id=self.config.realm_id)
+
+    async def log_many(self, rows: List[Dict[str, Any]]) -> None:
+        table = self.config.supabase.tables.recall_logs
+        if self.log_writer is not None:
+            self.log_writer.enqueue_many(self.supabase_client, table, self.config.realm_id, rows)
+            return
+        await self.supabase_client.insert_many_with_realm(table, rows, self.config.realm_id)
+
+    def _result_cache_settings(self) -> Optional[Dict[str, float]]:
+        settings = self.config.recall_config.get("result_cache") or {}
+        if self.result_cache is None or not settings.get("enabled", False):
+            return None
+        return {
+            "ttl_s": float(settings.get("ttl_s", 60)),
+            "stale_while_revalidate_s": float(settings.get("stale_while_revalidate_s", 300)),
+            "stale_if_error_s": float(settings.get("stale_if_error_s", 3600)),
+            "version_poll_s": float(settings.get("version_poll_s", 15)),
+        }
+
+    async def ingest_version(self, poll_s: float) -> Optional[int]:
+        """Last known ``realm_ingest_versions.version``, re-polled in the background every ``poll_s``."""
+        now = time.monotonic()
+        if self._ingest_version_refresh is None and now - self._ingest_version_checked_at >= poll_s:
+            self._ingest_version_checked_at = now
+            self._ingest_version_refresh = asyncio.get_running_loop().create_task(self._refresh_ingest_version())
+        if self._ingest_version is None and self._ingest_version_refresh is not None:
+            await asyncio.shield(self._ingest_version_refresh)
+        return self._ingest_version
+
+    async def _refresh_ingest_version(self) -> None:
+        try:
+            rows = await self.supabase_client.select_by_realm(
+                "realm_ingest_versions", self.config.realm_id, columns="version", limit=1, raise_errors=True
+            )
+            self._ingest_version = int(rows[0]["version"]) if rows else 0
+        except Exception as exc:
+            # Keep the last known version.
+            print(f"[recall] ingest version lookup failed for realm {self.config.realm_id}: {exc}")
+        finally:
+            self._ingest_version_refresh = None
+
+    @staticmethod
+    def _from_cache(entry: CachedRecall, stale: bool) -> Dict[str, Any]:
+        return {**entry.response, "cached": True, "stale": stale, "cache_age_ms": int(entry.age() * 1000)}
+
+    def _schedule_refresh(self, key: Any, payload: Dict[str, Any], version: Optional[int]) -> None:
+        if key in self._refreshing:
+            return
+
+        async def refresh() -> None:
+            try:
+                response = await self._compute(payload)
+                if not response["partial"]:
+                    self.result_cache.put(key, dict(response), version)
+            except Exception as exc:
+                print(f"[recall] background refresh failed for realm {self.config.realm_id}: {exc}")
+            finally:
+                self._refreshing.pop(key, None)
+
+        self.result_cache.refreshes += 1
+        self._refreshing[key] = asyncio.get_running_loop().create_task(refresh())
+
+    async def aclose(self) -> None:
+        if self._dimension_check is not None:
+            self._dimension_check.cancel()
+        if self._ingest_version_refresh is not None:
+            self._ingest_version_refresh.cancel()
+        for task in list(self._refreshing.values()):
+            task.cancel()
+        await asyncio.gather(*self._refreshing.values(), return_exceptions=True)
+        self._refreshing.clear()
+
+    async def _cache_lookup(self, payload: Dict[str, Any], settings: Dict[str, float]) -> Dict[str, Any]:
+        """Resolve the cache key/version and return a servable hit (fresh or revalidating) if any."""
+        cache = self.result_cache
+        key = cache.key(
+            self.config.realm_id, payload["query"], payload["top_k"], payload["vector_store"], filters_key(payload["filters"])
+        )
+        version = await self.ingest_version(settings["version_poll_s"])
+        entry = cache.get(key)
+        hit = None
+        if entry is not None and entry.ingest_version == version:
+            age = entry.age()
+            if age <= settings["ttl_s"]:
+                cache.hits += 1
+                hit = self._from_cache(entry, stale=False)
+            elif age <= settings["ttl_s"] + settings["stale_while_revalidate_s"]:
+                cache.stale_hits += 1
+                self._schedule_refresh(key, payload, version)
+                hit = self._from_cache(entry, stale=True)
+        if hit is None:
+            cache.misses += 1
+        return {"key": key, "version": version, "entry": entry, "hit": hit}
+
+    async def _cached_run(
+        self,
+        payload: Dict[str, Any],
+        settings: Dict[str, float],
+        timings: Optional[Dict[str, float]] = None,
+        embed: Optional[Callable[[str], Awaitable[Dict[str, Any]]]] = None,
+    ) -> Dict[str, Any]:
+        cache = self.result_cache
+        lookup_start = time.perf_counter()
+        lookup = await self._cache_lookup(payload, settings)
+        if timings is not None:
+            timings["cache_lookup_ms"] = _elapsed_ms(lookup_start)
+        if lookup["hit"] is not None:
+            return lookup["hit"]
+        key, version, entry = lookup["key"], lookup["version"], lookup["entry"]
+        # Backends down or degraded: an older answer (even from a previous ingest version) beats
+        # an error or a partial one.
+        servable = entry is not None and entry.age() <= settings["stale_if_error_s"]
+        if servable and self._supabase_refused(payload["vector_store"]):
+            # The answer would be partial anyway; skip the embedding call and the fallback search.
+            cache.stale_on_error += 1
+            return self._from_cache(entry, stale=True)
+        try:
+            response = await self._compute(payload, timings, embed)
+        except Exception:
+            if servable:
+                cache.stale_on_error += 1
+                return self._from_cache(entry, stale=True)
+            raise
+        if response["partial"]:
+            if servable:
+                cache.stale_on_error += 1
+                return self._from_cache(entry, stale=True)
+            return response
+        cache.put(key, dict(response), version)
+        return response
+
+    async def _compute(
+        self,
+        payload: Dict[str, Any],
+        timings: Optional[Dict[str, float]] = None,
+        embed: Optional[Callable[[str], Awaitable[Dict[str, Any]]]] = None,
+    ) -> Dict[str, Any]:
+        timings = {} if timings is None else timings
+        start = time.perf_counter()
+        embedded = await (embed or self._embed)(payload["query"])
+        timings["embed_ms"] = _elapsed_ms(start)
+        top_k = payload["top_k"]
+        search_start = time.perf_counter()
+        searched = await self.search_all(embedded["embedding"], top_k, payload["vector_store"], payload["filters"])
+        timings["search_ms"] = _elapsed_ms(search_start)
+        for name, status in searched["backends"].items():
+            timings[f"search_{name}_ms"] = status["latency_ms"]
+        merge_start = time.perf_counter()
+        candidates = self.merge(searched["ranked"], top_k)
+        timings["merge_ms"] = _elapsed_ms(merge_start)
+        return {
+            "matches": candidates,
+            "query_tokens": embedded["prompt_tokens"],
+            "recall_latency_ms": int(_elapsed_ms(start)),
+            "partial": searched["partial"],
+            "backends": searched["backends"],
+        }
+
+    def _normalise_payload(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            **payload,
+            "vector_store": payload.get("vector_store") or self.config.recall_config.get("vector_store", "both"),
+            "top_k": payload.get("top_k") or self.config.recall_config.get("top_k", 5),
+            "filters": normalise_filters(payload.get("filters")),
+        }
+
+    async def _single_flight(
+        self,
+        payload: Dict[str, Any],
+        compute: Callable[[Dict[str, float]], Awaitable[Dict[str, Any]]],
+        timings: Dict[str, float],
+    ) -> Tuple[Dict[str, Any], bool]:
+        """Share one computation (and its timings) between concurrent identical queries."""
+        if not self.config.recall_config.get("single_flight", True):
+            return await compute(timings), False
+        key = (
+            self.config.realm_id,
+            normalise_query(payload["query"]),
+            payload["top_k"],
+            payload["vector_store"],
+            filters_key(payload["filters"]),
         )
+        flight = self._in_flight.get(key)
+        joined = flight is not None
+        if joined:
+            self.coalesced += 1
+            RECALL_COALESCED.inc(self.config.realm_id)
+            task, flight_timings = flight
+        else:
+            self.flights += 1
+            flight_timings = {}
+            task = asyncio.get_running_loop().create_task(compute(flight_timings))
+            self._in_flight[key] = (task, flight_timings)
+
+            def finished(done: asyncio.Task) -> None:
+                self._in_flight.pop(key, None)
+                if not done.cancelled():
+                    done.exception()  # retrieved here in case every waiter went away
+
+            task.add_done_callback(finished)
+        response = dict(await asyncio.shield(task))
+        timings.update(flight_timings)
+        return response, joined
+
+    def single_flight_stats(self) -> Dict[str, int]:
+        return {"in_flight": len(self._in_flight), "flights": self.flights, "coalesced": self.coalesced}
+
+    def _observe(self, timings: Dict[str, float]) -> None:
+        realm_id = self.config.realm_id
+        for stage in ("embed", "merge", "log", "total"):
+            value = timings.get(f"{stage}_ms")
+            if value is not None:
+                RECALL_STAGE_SECONDS.observe(value / 1000.0, realm_id, stage)
 
     async def run(self, payload: Dict[str, Any]) -> Dict[str, Any]:
-        start = time.time()
+        """Recall for one query; per-stage timings are returned when ``include_timings`` is set."""
+        realm_id = self.config.realm_id
+        start = time.perf_counter()
+        timings: Dict[str, float] = {}
+        RECALL_IN_FLIGHT.inc(realm_id)
+        try:
+            await self.ensure_dimensions()
+            payload = self._normalise_payload(payload)
+            settings = self._result_cache_settings()
+            if settings is not None:
+                compute = partial(self._cached_run, payload, settings)
+            else:
+                compute = partial(self._compute, payload)
+            response, coalesced = await self._single_flight(payload, compute, timings)
+            response["coalesced"] = coalesced
+            latency_ms = int(_elapsed_ms(start))
+            response["recall_latency_ms"] = latency_ms
+            log_start = time.perf_counter()
+            await self.log(payload["query"], response["matches"], payload["vector_store"], latency_ms=latency_ms)
+            timings["log_ms"] = _elapsed_ms(log_start)
+            timings["total_ms"] = _elapsed_ms(start)
+        except Exception:
+            RECALL_REQUESTS.inc(realm_id, "error")
+            raise
+        finally:
+            RECALL_IN_FLIGHT.dec(realm_id)
+        self._observe(timings)
+        outcome = "cached" if response.get("cached") else "partial" if response["partial"] else "ok"
+        RECALL_REQUESTS.inc(realm_id, outcome)
+        if payload.get("include_timings"):
+            response["timings"] = timings
+        return response
+
+    async def _cached_frames(
+        self, payload: Dict[str, Any], cached: Dict[str, Any], start: float, timings: Dict[str, float]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        latency_ms = int(_elapsed_ms(start))
+        yield {"type": "merged", "matches": cached["matches"]}
+        await self._log_stream(payload, cached["matches"], latency_ms, timings)
+        timings["total_ms"] = _elapsed_ms(start)
+        yield {
+            "type": "summary",
+            **{key: value for key, value in cached.items() if key != "matches"},
+            "recall_latency_ms": latency_ms,
+            "timings": timings,
+        }
+
+    async def _log_stream(
+        self, payload: Dict[str, Any], matches: List[Dict[str, Any]], latency_ms: int, timings: Dict[str, float]
+    ) -> None:
+        # Written before the summary frame: a client that hangs up after the last frame never resumes the generator.
+        log_start = time.perf_counter()
+        await self.log(payload["query"], matches, payload["vector_store"], latency_ms=latency_ms)
+        timings["log_ms"] = _elapsed_ms(log_start)
+
+    async def stream(self, payload: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield ``backend`` frames as stores finish, then ``merged`` and ``summary`` (or ``error``)."""
+        realm_id = self.config.realm_id
+        timings: Dict[str, float] = {}
+        RECALL_IN_FLIGHT.inc(realm_id)
+        try:
+            async for frame in self._stream_frames(payload, timings):
+                # Counted before the last frame goes out; the client may not ask for anything after it.
+                if frame["type"] == "summary":
+                    self._observe(timings)
+                    outcome = "cached" if frame.get("cached") else "partial" if frame["partial"] else "ok"
+                    RECALL_REQUESTS.inc(realm_id, outcome)
+                elif frame["type"] == "error":
+                    RECALL_REQUESTS.inc(realm_id, "error")
+                yield frame
+        except Exception:
+            RECALL_REQUESTS.inc(realm_id, "error")
+            raise
+        finally:
+            RECALL_IN_FLIGHT.dec(realm_id)
+
+    async def _stream_frames(self, payload: Dict[str, Any], timings: Dict[str, float]) -> AsyncIterator[Dict[str, Any]]:
+        start = time.perf_counter()
+        await self.ensure_dimensions()
+        payload = self._normalise_payload(payload)
+        settings = self._result_cache_settings()
+        lookup = None
+        if settings is not None:
+            lookup_start = time.perf_counter()
+            lookup = await self._cache_lookup(payload, settings)
+            timings["cache_lookup_ms"] = _elapsed_ms(lookup_start)
+        if lookup is not None and lookup["hit"] is not None:
+            async for frame in self._cached_frames(payload, lookup["hit"], start, timings):
+                yield frame
+            return
+        entry = lookup["entry"] if lookup is not None else None
+        servable = entry is not None and entry.age() <= settings["stale_if_error_s"]
+        if servable and self._supabase_refused(payload["vector_store"]):
+            self.result_cache.stale_on_error += 1
+            async for frame in self._cached_frames(payload, self._from_cache(entry, stale=True), start, timings):
+                yield frame
+            return
+
+        embed_start = time.perf_counter()
         embedded = await self._embed(payload["query"])
-        candidates: List[Dict[str, Any]] = []
-        vector_store_setting = payload.get("vector_store") or self.config.recall_config.get("vector_store", "both")
-        top_k = payload.get("top_k", 5)
+        timings["embed_ms"] = _elapsed_ms(embed_start)
+        top_k = payload["top_k"]
+        names = self._selected_backends(payload["vector_store"])
+        fetch_k = self.fetch_k(top_k)
+        tasks = [
+            asyncio.ensure_future(self._search_backend(name, embedded["embedding"], fetch_k, payload["filters"]))
+            for name in names
+        ]
+        ranked: Dict[str, List[Dict[str, Any]]] = {}
+        backends: Dict[str, Dict[str, Any]] = {}
+        try:
+            for finished in asyncio.as_completed(tasks):
+                result = await finished
+                backends[result["name"]] = result["status"]
+                timings[f"search_{result['name']}_ms"] = result["status"]["latency_ms"]
+                ranked[result["name"]] = result["matches"]
+                yield {"type": "backend", "backend": result["name"], "status": result["status"], "matches": result["matches"]}
+        finally:
+            for task in tasks:
+                task.cancel()
 
-        if vector_store_setting in {"openai", "both"}:
-            candidates.extend(await self.search_openai(embedded["embedding"], top_k))
-        if vector_store_setting in {"supabase", "both"} or self.config.recall_config.get("use_supabase_pgvector"):
-            candidates.extend(await self.search_supabase(embedded["embedding"], top_k))
+        partial, all_failed = _backend_outcome(backends)
+        if (partial or all_failed) and servable:
+            self.result_cache.stale_on_error += 1
+            async for frame in self._cached_frames(payload, self._from_cache(entry, stale=True), start, timings):
+                yield frame
+            return
+        if all_failed:
+            yield {"type": "error", "message": str(RecallBackendsUnavailable(backends)), "backends": backends}
+            return
+        merge_start = time.perf_counter()
+        matches = self.merge(ranked, top_k)
+        timings["merge_ms"] = _elapsed_ms(merge_start)
+        latency_ms = int(_elapsed_ms(start))
+        yield {"type": "merged", "matches": matches}
+        await self._log_stream(payload, matches, latency_ms, timings)
+        timings["total_ms"] = _elapsed_ms(start)
+        response = {
+            "matches": matches,
+            "query_tokens": embedded["prompt_tokens"],
+            "recall_latency_ms": latency_ms,
+            "partial": partial,
+            "backends": backends,
+        }
+        if lookup is not None and not partial:
+            self.result_cache.put(lookup["key"], response, lookup["version"])
+        yield {
+            "type": "summary",
+            **{key: value for key, value in response.items() if key != "matches"},
+            "timings": timings,
+            "cached": False,
+        }
+
+    async def embed_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Embed many texts with one API call, skipping any already in the embedding cache."""
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+        for index, text in enumerate(texts):
+            if self.embedding_cache is not None:
+                cached = self.embedding_cache.get(self.embedding_cache.key(self.embedding_model, self.embedding_dimensions, text))
+                if cached is not None:
+                    results[index] = cached
+                    continue
+            missing.setdefault(text, []).append(index)
+        if missing:
+            unique_texts = list(missing)
+            embedded = await self._embed_many(unique_texts)
+            for text, item in zip(unique_texts, embedded):
+                if self.embedding_cache is not None:
+                    key = self.embedding_cache.key(self.embedding_model, self.embedding_dimensions, text)
+                    self.embedding_cache.put(key, item["embedding"], item["prompt_tokens"])
+                for index in missing[text]:
+                    results[index] = item
+        return results
+
+    async def run_batch(self, payloads: List[Dict[str, Any]], concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """Recall many queries: one embeddings call, then each query through ``run``'s cache and single-flight path."""
+        realm_id = self.config.realm_id
+        start = time.perf_counter()
+        await self.ensure_dimensions()
+        cap = int(self.config.recall_config.get("batch_max_concurrency", 8))
+        semaphore = asyncio.Semaphore(max(1, min(concurrency or cap, cap)))
+        settings = self._result_cache_settings()
+        normalised: List[Optional[Dict[str, Any]]] = [None] * len(payloads)
+        embedding = asyncio.get_running_loop().create_task(self.embed_batch([payload["query"] for payload in payloads]))
 
-        candidates = sorted(candidates, key=lambda item: -item.get("score", 0.0))[:top_k]
-        await self.log(payload["query"], candidates, vector_store_setting)
+        async def batch_embedding(index: int, query: str) -> Dict[str, Any]:
+            # Shielded: a cancelled query must not cancel the embeddings call the others share.
+            return (await asyncio.shield(embedding))[index]
+
+        async def one(index: int, payload: Dict[str, Any]) -> Dict[str, Any]:
+            async with semaphore:
+                query_start = time.perf_counter()
+                timings: Dict[str, float] = {}
+                RECALL_IN_FLIGHT.inc(realm_id)
+                try:
+                    payload = normalised[index] = self._normalise_payload(payload)
+                    embed = partial(batch_embedding, index)
+                    if settings is not None:
+                        compute = partial(self._cached_run, payload, settings, embed=embed)
+                    else:
+                        compute = partial(self._compute, payload, embed=embed)
+                    response, coalesced = await self._single_flight(payload, compute, timings)
+                except Exception as exc:
+                    RECALL_REQUESTS.inc(realm_id, "error")
+                    return {"query": payload["query"], "error": str(exc)}
+                finally:
+                    RECALL_IN_FLIGHT.dec(realm_id)
+                response["coalesced"] = coalesced
+                response["recall_latency_ms"] = int(_elapsed_ms(query_start))
+                timings["total_ms"] = _elapsed_ms(query_start)
+                self._observe(timings)
+                outcome = "cached" if response.get("cached") else "partial" if response["partial"] else "ok"
+                RECALL_REQUESTS.inc(realm_id, outcome)
+                if payload.get("include_timings"):
+                    response["timings"] = timings
+                return {"query": payload["query"], "response": response}
+
+        try:
+            results = await asyncio.gather(*(one(index, payload) for index, payload in enumerate(payloads)))
+        finally:
+            # Still running only if no query needed it (result cache hits or coalesced flights).
+            embedding.cancel()
+        (embedded,) = await asyncio.gather(embedding, return_exceptions=True)
+        query_tokens = 0
+        if isinstance(embedded, list):
+            query_tokens = sum(item["prompt_tokens"] for item in embedded)
+        elif not isinstance(embedded, asyncio.CancelledError):
+            print(f"[recall] batch embedding failed for realm {realm_id}: {embedded}")
+        log_rows = [
+            self._log_row(
+                result["query"],
+                result["response"]["matches"],
+                payload["vector_store"],
+                latency_ms=result["response"]["recall_latency_ms"],
+            )
+            for payload, result in zip(normalised, results)
+            if "response" in result
+        ]
+        if log_rows:
+            log_start = time.perf_counter()
+            await self.log_many(log_rows)
+            RECALL_STAGE_SECONDS.observe(_elapsed_ms(log_start) / 1000.0, realm_id, "log")
         return {
-            "matches": candidates,
-            "query_tokens": embedded["prompt_tokens"],
-            "recall_latency_ms": int((time.time() - start) * 1000),
+            "results": results,
+            "query_tokens": query_tokens,
+            "recall_latency_ms": int(_elapsed_ms(start)),
         }
@@ -0,0 +1,177 @@
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+class CircuitOpen(RuntimeError):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+    def __init__(self, name: str, retry_in_s: float):
+        self.retry_in_s = retry_in_s
+        super().__init__(f"Circuit open for {name}; next probe in {retry_in_s:.1f}s")
+
+
+class LatencyWindow:
+    """Rolling window of recent successful call latencies for quantile estimates."""
+
+    def __init__(self, size: int = 256) -> None:
+        self._samples: Deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half_open (one probe) -> closed."""
+
+    def __init__(self, failure_threshold: int, reset_s: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_s = reset_s
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self.opens = 0
+        self.rejections = 0
+
+    def retry_in(self) -> float:
+        return max(0.0, self.opened_at + self.reset_s - time.monotonic())
+
+    def is_open(self) -> bool:
+        return self.state == "open" and self.retry_in() > 0
+
+    def allow(self) -> bool:
+        if self.state == "open" and self.retry_in() <= 0:
+            self.state = "half_open"
+            self._probe_in_flight = False
+        if self.state == "closed":
+            return True
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejections += 1
+        return False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.opens += 1
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+class RpcGuard:
+    """Circuit breaker plus latency-based hedging around one upstream (a Supabase project)."""
+
+    def __init__(self, name: str, failure_threshold: int, reset_s: float) -> None:
+        self.name = name
+        self.breaker = CircuitBreaker(failure_threshold, reset_s)
+        self.latency = LatencyWindow()
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self, settings: Dict[str, Any]) -> Optional[float]:
+        if not settings.get("hedge") or len(self.latency) < int(settings.get("hedge_min_samples", 20)):
+            return None
+        estimate = self.latency.quantile(float(settings.get("hedge_quantile", 0.95)))
+        low = float(settings.get("hedge_min_delay_ms", 50)) / 1000.0
+        high = float(settings.get("hedge_max_delay_ms", 2000)) / 1000.0
+        return min(high, max(low, estimate))
+
+    async def call(self, make_call: Callable[[], Awaitable[T]], settings: Optional[Dict[str, Any]] = None) -> T:
+        if not self.breaker.allow():
+            raise CircuitOpen(self.name, self.breaker.retry_in())
+        self.calls += 1
+        delay = self.hedge_delay(settings or {})
+        loop = asyncio.get_running_loop()
+        started: Dict[asyncio.Task, float] = {}
+
+        def launch() -> asyncio.Task:
+            task = loop.create_task(make_call())
+            started[task] = time.perf_counter()
+            return task
+
+        first = launch()
+        pending = {first}
+        error: Optional[BaseException] = None
+        try:
+            if delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=delay)
+                if not done:
+                    self.hedges += 1
+                    pending.add(launch())
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.latency.add(time.perf_counter() - started[task])
+                        if task is not first:
+                            self.hedge_wins += 1
+                        self.breaker.record_success()
+                        return task.result()
+                    error = task.exception()
+        except asyncio.CancelledError:
+            self.breaker.record_failure()
+            raise
+        finally:
+            for task in started:
+                if not task.done():
+                    task.cancel()
+        self.breaker.record_failure()
+        raise error
+
+    def stats(self) -> Dict[str, Any]:
+        p50 = self.latency.quantile(0.5)
+        p95 = self.latency.quantile(0.95)
+        return {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "opens": self.breaker.opens,
+            "rejections": self.breaker.rejections,
+            "calls": self.calls,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+class RpcGuards:
+    """One ``RpcGuard`` per upstream, shared by every realm that uses it."""
+
+    def __init__(self, failure_threshold: Optional[int] = None, reset_s: Optional[float] = None) -> None:
+        self.failure_threshold = failure_threshold or int(os.getenv("RECALL_BREAKER_FAILURES", "5"))
+        self.reset_s = reset_s or float(os.getenv("RECALL_BREAKER_RESET_S", "30"))
+        self._guards: Dict[str, RpcGuard] = {}
+
+    def get(self, name: str) -> RpcGuard:
+        guard = self._guards.get(name)
+        if guard is None:
+            guard = self._guards[name] = RpcGuard(name, self.failure_threshold, self.reset_s)
+        return guard
+
+    def stats(self) -> Dict[str, Any]:
+        return {name: guard.stats() for name, guard in self._guards.items()}
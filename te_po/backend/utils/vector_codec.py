@@ -0,0 +1,69 @@
+import base64
+import json
+import math
+import sys
+from array import array
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Any, Iterable, Union
+
+try:
+    import orjson
+except ImportError:  # optional: stdlib json is used when orjson is not installed
+    orjson = None
+
+Vector = Union[array, Iterable[float]]
+
+
+def decode_embedding(value: Union[str, Iterable[float]]) -> array:
+    """Embedding from an OpenAI response (base64 float32 or a JSON list) as a packed float32 array."""
+    if isinstance(value, str):
+        vector = array("f")
+        vector.frombytes(base64.b64decode(value))
+        if sys.byteorder != "little":
+            vector.byteswap()
+        return vector
+    if isinstance(value, array) and value.typecode == "f":
+        return value
+    return array("f", value)
+
+
+def truncate_embedding(vector: array, dimensions: int) -> array:
+    """Keep the first ``dimensions`` values (Matryoshka prefix) and rescale to unit length."""
+    if len(vector) < dimensions:
+        raise ValueError(f"Embedding has {len(vector)} dims, cannot truncate to {dimensions}")
+    prefix = vector[:dimensions]
+    norm = math.sqrt(sum(value * value for value in prefix))
+    if norm:
+        prefix = array("f", [value / norm for value in prefix])
+    return prefix
+
+
+def pgvector_literal(vector: Vector) -> str:
+    """pgvector text input (``[x,y,...]``) with float32 round-trip precision (``%.9g``)."""
+    values = tuple(vector)
+    return _literal_format(len(values)) % values
+
+
+@lru_cache(maxsize=8)
+def _literal_format(dimensions: int) -> str:
+    return "[" + ",".join(["%.9g"] * dimensions) + "]"
+
+
+def _json_default(value: Any) -> str:
+    # Same ISO 8601 text orjson writes natively.
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(payload: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False, default=_json_default).encode("utf-8")
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)